@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Micro-benchmark for the light-locker Exec line codec: the time per
+parse is compared with the argparse based parser the codec replaced. Its
+correctness is checked by tests/test_cmdline.py.
+
+    benchmarks/cmdline_benchmark.py [--number N] '''
+
+from __future__ import print_function
+
+import argparse
+import os
+import shlex
+import sys
+import timeit
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR),
+                                'light-locker-settings'))
+
+import light_locker_cmdline
+
+SAMPLE = ("light-locker --lock-after-screensaver=300 --no-lock-on-suspend "
+          "--no-late-locking")
+
+
+def legacy_parse(ll_exec):
+    """The parser used before the codec."""
+    value = ll_exec.replace("=", " ")
+    splitargs = shlex.split(value)
+    parser = argparse.ArgumentParser(description='Light Locker Settings')
+    parser.add_argument("--lock-after-screensaver", action='store_true')
+    parser.add_argument("--late-locking", action='store_true')
+    parser.add_argument("--lock-on-suspend", action='store_true')
+    return parser.parse_known_args(splitargs)
+
+
+def codec_parse(ll_exec):
+    """Parse ll_exec and read the managed options."""
+    line = light_locker_cmdline.parse(ll_exec)
+    return (line.get('lock-after-screensaver'), line.get('late-locking'),
+            line.get('lock-on-suspend'))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--number', type=int, default=20000,
+                        help='parses per measurement')
+    args = parser.parse_args(argv)
+
+    number = args.number
+    codec = min(timeit.repeat(lambda: codec_parse(SAMPLE), number=number,
+                              repeat=3)) / number * 1e6
+    legacy = min(timeit.repeat(lambda: legacy_parse(SAMPLE),
+                               number=number // 20, repeat=3)) / \
+        (number // 20) * 1e6
+    print("%-10s %10.2f us per parse" % ('codec', codec))
+    print("%-10s %10.2f us per parse" % ('argparse', legacy))
+    print("speedup    %10.1fx" % (legacy / codec))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
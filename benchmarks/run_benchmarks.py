@@ -0,0 +1,333 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Benchmarks for the settings backends.
+
+The operations run against local stand-ins: stub xfconf-query, xset and
+light-locker executables on PATH, a synthetic process table of N processes
+and a temporary XDG config directory. The session bus and the display are
+hidden so the subprocess paths are exercised. For every operation and
+process table size the median wall time and the number of external
+processes spawned per call, after one warm-up call, are reported. Spawns
+are counted at subprocess.Popen, so commands run behind the back of
+light_locker_commands (e.g. ldconfig run by ctypes.util) count as well.
+
+    benchmarks/run_benchmarks.py                   report, compare baseline
+    benchmarks/run_benchmarks.py --save-baseline   store the spawn counts
+    benchmarks/run_benchmarks.py --save-baseline --save-times
+                                                   store the times as well
+
+A run fails (exit status 1) if an operation spawns more processes than its
+stored baseline, or, if the baseline has times, is slower than the baseline
+by more than --tolerance. Spawn counts do not depend on the machine, the
+committed baseline.json only holds those.
+'''
+
+from __future__ import print_function
+
+import argparse
+import collections
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR),
+                          'light-locker-settings')
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+STUBS = {
+    'xfconf-query': '''#!/bin/sh
+case "$*" in
+    *-l*)
+        echo "/xfce4-power-manager/lock-screen-suspend-hibernate  true"
+        echo "/xfce4-power-manager/logind-handle-lid-switch       true"
+        echo "/shutdown/LockScreen                                true"
+        ;;
+esac
+''',
+    'xset': '''#!/bin/sh
+if [ "$1" = "q" ]; then
+    echo "Screen Saver:"
+    echo "  prefer blanking:  yes    allow exposures:  yes"
+    echo "  timeout:  600    cycle:  600"
+    echo "DPMS (Energy Star):"
+    echo "  Standby: 900    Suspend: 900    Off: 900"
+fi
+''',
+    # Only looked up on PATH, never run.
+    'xfce4-power-manager': '''#!/bin/sh
+''',
+    'xfce4-session': '''#!/bin/sh
+''',
+    'light-locker': '''#!/bin/sh
+trap 'exit 0' TERM
+while :; do sleep 0.05; done
+''',
+}
+
+LIGHT_LOCKER_DESKTOP = '''[Desktop Entry]
+Type=Application
+Name=Screen Locker
+Exec=light-locker --lock-after-screensaver=300 --no-late-locking --lock-on-suspend
+'''
+
+
+class FakeUids:
+    def __init__(self, uid):
+        self.real = uid
+
+
+class FakeProcess:
+    """Minimal stand-in for psutil.Process."""
+    def __init__(self, pid, name, uid):
+        self.pid = pid
+        self._name = name
+        self._uid = uid
+
+    def name(self):
+        return self._name
+
+    def uids(self):
+        return FakeUids(self._uid)
+
+    def terminate(self):
+        pass
+
+
+class FakePsutil:
+    """Stand-in for the psutil module serving a synthetic process table of
+    size processes. A quarter of them belong to the current user, the rest
+    to another one."""
+    def __init__(self, size):
+        uid = os.getuid()
+        session = ['xfce4-session', 'xfce4-power-manager', 'light-locker']
+        self.processes = []
+        for pid in range(1, size + 1):
+            if pid <= len(session):
+                name, owner = session[pid - 1], uid
+            else:
+                name = 'process-%d' % pid
+                owner = uid if pid % 4 == 0 else uid + 1
+            self.processes.append(FakeProcess(pid, name, owner))
+        self.by_pid = dict((p.pid, p) for p in self.processes)
+        # Make Process(pid) return the existing fake.
+        self.Process = lambda pid: self.by_pid[pid]
+
+    def process_iter(self):
+        return iter(self.processes)
+
+
+def setup_environment(root):
+    """Create the stand-ins below root and point the environment at them."""
+    bindir = os.path.join(root, 'bin')
+    os.makedirs(bindir)
+    for name, script in STUBS.items():
+        path = os.path.join(bindir, name)
+        with open(path, 'w') as stub:
+            stub.write(script)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+    autostart = os.path.join(root, 'config', 'autostart')
+    os.makedirs(autostart)
+    with open(os.path.join(autostart, 'light-locker.desktop'), 'w') as f:
+        f.write(LIGHT_LOCKER_DESKTOP)
+
+    os.environ['PATH'] = bindir + os.pathsep + os.environ.get('PATH', '')
+    os.environ['XDG_CONFIG_HOME'] = os.path.join(root, 'config')
+    os.environ['XDG_CONFIG_DIRS'] = os.path.join(root, 'etc')
+    os.environ['XDG_CACHE_HOME'] = os.path.join(root, 'cache')
+    os.environ['XDG_RUNTIME_DIR'] = os.path.join(root, 'run')
+    # Force the subprocess paths: no session bus, no display, no schema.
+    os.environ['DBUS_SESSION_BUS_ADDRESS'] = \
+        'unix:path=' + os.path.join(root, 'no-bus')
+    os.environ.pop('DISPLAY', None)
+    os.environ['GSETTINGS_BACKEND'] = 'memory'
+    os.environ['GSETTINGS_SCHEMA_DIR'] = os.path.join(root, 'schemas')
+
+
+class CountingPopen(subprocess.Popen):
+    """subprocess.Popen counting the processes it starts."""
+    spawns = 0
+    lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        with CountingPopen.lock:
+            CountingPopen.spawns += 1
+        super(CountingPopen, self).__init__(*args, **kwargs)
+
+
+def count_spawns():
+    """Return the number of processes started so far."""
+    return CountingPopen.spawns
+
+
+def get_operations(xfsync):
+    """Return the benchmarked operations, each a callable taking a fresh
+    backend."""
+    def init_settings(backend):
+        backend.get_settings()
+
+    def apply_settings(backend):
+        settings = backend.get_settings()
+        backend.write_settings(settings)
+
+    def xfpm_sync(backend):
+        xfsync.xfconf_invalidate()
+        xfsync.XfpmSync()
+
+    def xfce_session_sync(backend):
+        xfsync.xfconf_invalidate()
+        xfsync.XfceSessionSync()
+
+    def ll_keyfile_get_settings(backend):
+        backend.ll_keyfile_get_settings()
+
+    return collections.OrderedDict([
+        ('init_settings', init_settings),
+        ('apply_settings', apply_settings),
+        ('XfpmSync', xfpm_sync),
+        ('XfceSessionSync', xfce_session_sync),
+        ('ll_keyfile_get_settings', ll_keyfile_get_settings),
+    ])
+
+
+def run_benchmarks(sizes, repeat):
+    """Run every operation for every process table size, return the
+    results as {operation: {size: {"time_ms": t, "spawns": n}}}."""
+    sys.path.insert(0, SOURCE_DIR)
+    subprocess.Popen = CountingPopen
+    import light_locker_backend
+    import light_locker_supervisor
+    import light_locker_xfsync
+
+    operations = get_operations(light_locker_xfsync)
+    results = collections.OrderedDict()
+    for name, operation in operations.items():
+        results[name] = collections.OrderedDict()
+        # Fill the process-wide caches first, so that the counts do not
+        # depend on which size runs first.
+        light_locker_backend.psutil = FakePsutil(sizes[0])
+        light_locker_backend.old_psutil_format = False
+        operation(light_locker_backend.LightLockerBackend())
+        for size in sizes:
+            light_locker_backend.psutil = FakePsutil(size)
+            light_locker_backend.old_psutil_format = False
+            timings = []
+            spawns_before = count_spawns()
+            for i in range(repeat):
+                backend = light_locker_backend.LightLockerBackend()
+                start = time.time()
+                operation(backend)
+                timings.append((time.time() - start) * 1000)
+            spawns = (count_spawns() - spawns_before) / float(repeat)
+            timings.sort()
+            results[name][str(size)] = {
+                'time_ms': round(timings[len(timings) // 2], 3),
+                'spawns': spawns
+            }
+
+    # Stop the light-locker stub started by the last apply.
+    pids, certain = light_locker_supervisor.find_light_locker()
+    light_locker_supervisor.stop(pids)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions of results against baseline."""
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference is None:
+                continue
+            if result['spawns'] > reference['spawns']:
+                regressions.append(
+                    "%s [%s]: %.1f processes spawned, baseline %.1f" %
+                    (name, size, result['spawns'], reference['spawns']))
+            if 'time_ms' not in reference:
+                continue
+            limit = reference['time_ms'] * (1 + tolerance)
+            if result['time_ms'] > limit:
+                regressions.append(
+                    "%s [%s]: %.3f ms, baseline %.3f ms" %
+                    (name, size, result['time_ms'], reference['time_ms']))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='100,1000,5000',
+                        help='comma separated process table sizes')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='calls per operation and size')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown against the baseline, '
+                             'as a fraction')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='baseline file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the spawn counts as the new baseline')
+    parser.add_argument('--save-times', action='store_true',
+                        help='with --save-baseline, store the times too')
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    root = tempfile.mkdtemp(prefix='light-locker-settings-bench-')
+    try:
+        setup_environment(root)
+        results = run_benchmarks(sizes, args.repeat)
+    finally:
+        shutil.rmtree(root)
+
+    print("%-26s %8s %12s %8s" % ('operation', 'procs', 'time (ms)',
+                                  'spawns'))
+    for name, sizes_results in results.items():
+        for size, result in sizes_results.items():
+            print("%-26s %8s %12.3f %8.1f" % (name, size, result['time_ms'],
+                                              result['spawns']))
+
+    if args.save_baseline:
+        if not args.save_times:
+            for sizes_results in results.values():
+                for result in sizes_results.values():
+                    del result['time_ms']
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored, run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print("REGRESSION: %s" % regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
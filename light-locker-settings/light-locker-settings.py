@@ -16,6 +16,8 @@
 #   You should have received a copy of the GNU General Public License along
 #   with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import light_locker_profile
+
 import gettext
 
 gettext.textdomain('light-locker-settings')
@@ -23,43 +25,59 @@ gettext.textdomain('light-locker-settings')
 from gettext import gettext as _
 from gettext import ngettext
 
-import re
-import argparse
-import shlex
 import os
-import subprocess
-from gi.repository import Gtk, GLib, Gio
-
-import psutil
-
-old_psutil_format = isinstance(psutil.Process.username, property)
+import sys
+import threading
+import traceback
+from gi.repository import GLib, Gio
+
+import light_locker_cli
+import light_locker_commands
+from light_locker_backend import SLIDER_MAX, LightLockerBackend, \
+    WriteError, changed_settings, watch_autostart
+
+# Imported by main() once it is clear that the window is needed.
+Gtk = None
+
+# The user interface compiled by glib-compile-resources at build time.
+UI_RESOURCE = "light-locker-settings.gresource"
+UI_RESOURCE_PATH = "/org/antergos/light-locker-settings/" \
+                   "light-locker-settings.glade"
+
+# Milliseconds without further changes before instant-apply writes them.
+INSTANT_APPLY_DELAY = 500
+
+# The backends written by Apply, as shown while they are written.
+BACKEND_LABELS = {
+    'xfce4-session': _("Xfce Session"),
+    'xfce4-power-manager': _("Xfce Power Manager"),
+    'light-locker': _("Screen Locker"),
+    'screen-blank': _("Screensaver")
+}
 
-import light_locker_xfsync
+# The environment variables gettext picks the translations by.
+LOCALE_VARIABLES = ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG')
 
 ''' Settings window for the light-locker '''
 
-username = GLib.get_user_name()
-
-screensaver_managers = {
-    'xfce4-power-manager': (_("Xfce Power Manager"), "xfce4-power-manager -c")
-}
 
-
-class LightLockerSettings:
+class LightLockerSettings(LightLockerBackend):
     """Light Locker Settings application class."""
 
-    def __init__(self):
-        """Initialize the Light Locker Settings application."""
-        self.light_locker_keyfile = None
-        self.screensaver_keyfile = None
+    def __init__(self, instant_apply=False):
+        """Initialize the Light Locker Settings application. With
+        instant_apply, changes are written as soon as the user settles
+        instead of when Apply is clicked."""
+        LightLockerBackend.__init__(self)
+        self.instant_apply = instant_apply
+        self.instant_apply_source = None
 
-        self.builder = Gtk.Builder()
-        self.builder.set_translation_domain('light-locker-settings')
+        with light_locker_profile.phase('builder load'):
+            self.builder = Gtk.Builder()
+            self.builder.set_translation_domain('light-locker-settings')
 
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        glade_file = os.path.join(script_dir, "light-locker-settings.glade")
-        self.builder.add_from_file(glade_file)
-        self.builder.connect_signals(self)
+            self.load_ui()
+            self.builder.connect_signals(self)
 
         self.window = self.builder.get_object("light_locker_settings_window")
         self.window.set_title(_("Light Locker Settings"))
@@ -79,6 +97,15 @@ class LightLockerSettings:
         self.lock_on_suspend = self.builder.get_object("lock_on_suspend")
 
         self.apply = self.builder.get_object("apply")
+        if self.instant_apply:
+            self.apply.hide()
+        self.cancel_apply = self.builder.get_object("cancel_apply")
+        self.apply_progress = self.builder.get_object("apply_progress")
+        self.apply_spinner = self.builder.get_object("apply_spinner")
+        self.apply_status = self.builder.get_object("apply_status")
+        self.apply_operation = None
+        self.apply_cancellable = None
+        self.quit_pending = False
 
         ''' Set up scales '''
         self.screenblank_timeout = self.builder.get_object(
@@ -93,16 +120,16 @@ class LightLockerSettings:
             self.screenoff_timeout.add_mark(i * 10, 3, None)
             self.lock_delay.add_mark(i * 10, 3, None)
 
-        self.screensaver_managed = False
-        self.gsettings = None
-
-        self.gsettings_init()
-
-        self.init_settings()
+        self.probes_done = set()
+        self.locking_frame = self.builder.get_object("locking_frame")
+        self.screensaver_frame = self.builder.get_object("screensaver_frame")
 
         ''' Monitor changes to the settings '''
         self.apply.set_sensitive(False)
-        self.locksettings_changed = False
+        self.loaded_settings = dict()
+        self.changed = False
+        self.loading = False
+        self.gsettings_handler = None
         self.screenblank_timeout.connect(
             "value-changed", self.screenblank_value_changed_cb)
         self.screenoff_timeout.connect(
@@ -110,12 +137,75 @@ class LightLockerSettings:
         self.lock_delay.connect(
             "value-changed", self.lock_delay_value_changed_cb)
 
+        # Use the settings daemon if one is running, it has them at hand.
+        import light_locker_daemon
+        self.client = light_locker_daemon.Client.connect()
+        self.daemon_settings = None
+
+        self.init_settings()
+
+        # Pick up edits made to light-locker.desktop by other programs, the
+        # daemon does that itself.
+        if self.client is None:
+            watch_autostart('light-locker.desktop', self.autostart_changed_cb)
+
+        self.window.connect("map-event", self.window_mapped_cb)
         self.window.show()
 
+    def load_ui(self):
+        """Load the user interface from the compiled resource bundle, which
+        is mapped rather than read and parsed, or from the .glade file
+        next to the script in an uninstalled tree."""
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        resource_file = os.path.join(script_dir, UI_RESOURCE)
+        if os.path.isfile(resource_file):
+            try:
+                Gio.resources_register(Gio.Resource.load(resource_file))
+                self.builder.add_from_resource(UI_RESOURCE_PATH)
+                return
+            except GLib.Error:
+                pass
+
+        glade_file = os.path.join(script_dir, "light-locker-settings.glade")
+        self.builder.add_from_file(glade_file)
+
     # Application Callbacks
+    def settings_changed(self):
+        """Enable saving once the user has modified a setting. Changes made
+        while the current settings are being loaded are ignored."""
+        if self.loading:
+            return
+        self.changed = True
+        self.apply.set_sensitive(self.settings_loaded())
+        if self.instant_apply and self.settings_loaded():
+            self.schedule_instant_apply()
+
+    def schedule_instant_apply(self):
+        """(Re)start the instant-apply timer, so that a burst of changes,
+        such as dragging a slider, results in a single write once the user
+        settles."""
+        if self.instant_apply_source is not None:
+            GLib.source_remove(self.instant_apply_source)
+        self.instant_apply_source = GLib.timeout_add(
+            INSTANT_APPLY_DELAY, self.instant_apply_cb)
+
+    def instant_apply_cb(self):
+        """Write the changes collected since the timer was started."""
+        self.instant_apply_source = None
+        self.apply_cb(self.apply)
+        return False
+
+    def flush_instant_apply(self):
+        """Write pending changes right away, used when the window closes."""
+        if self.instant_apply_source is not None:
+            GLib.source_remove(self.instant_apply_source)
+            self.instant_apply_cb()
+
     def screenblank_value_changed_cb(self, gparam):
         """Sync screenblank and screenoff settings when values are modified."""
-        self.apply.set_sensitive(True)
+        if self.loading:
+            return
+        self.settings_changed()
 
         blank_timeout = int(self.screenblank_timeout.get_value())
         off_timeout = int(self.screenoff_timeout.get_value())
@@ -126,7 +216,9 @@ class LightLockerSettings:
 
     def screenoff_value_changed_cb(self, gparam):
         """Sync screenblank and screenoff settings when values are modified."""
-        self.apply.set_sensitive(True)
+        if self.loading:
+            return
+        self.settings_changed()
 
         blank_timeout = int(self.screenblank_timeout.get_value())
         off_timeout = int(self.screenoff_timeout.get_value())
@@ -139,8 +231,7 @@ class LightLockerSettings:
         """Update the displayed lock controls when light-locker is enabled or
         disabled."""
         ''' if on then allow for the timeout to be set '''
-        self.locksettings_changed = True
-        self.apply.set_sensitive(True)
+        self.settings_changed()
         if switch.get_active():
             self.lock_delay.set_sensitive(False)
             self.session_lock_combo.set_sensitive(False)
@@ -154,8 +245,7 @@ class LightLockerSettings:
     def on_session_lock_combo_changed(self, widget):
         """Update the displayed screen blanking controls when locking is
         enabled or disabled."""
-        self.locksettings_changed = True
-        self.apply.set_sensitive(True)
+        self.settings_changed()
 
         # Check the session lock combo:
         #  0. lock when screensaver is activated
@@ -166,264 +256,237 @@ class LightLockerSettings:
 
     def lock_delay_value_changed_cb(self, gparam):
         """Enable saving of lock setting when the delay has been modified."""
-        self.locksettings_changed = True
-        self.apply.set_sensitive(True)
+        if self.loading:
+            return
+        self.settings_changed()
 
     def lock_on_suspend_cb(self, widget, gparam):
         """Enable saving when locking on suspend is changed."""
-        self.locksettings_changed = True
-        self.apply.set_sensitive(True)
+        self.settings_changed()
 
     def apply_cb(self, button, data=None):
-        """Apply changes and update the relevant setting files."""
-        self.apply_settings()
+        """Apply changes and update the relevant setting files on a worker
+        thread, the window stays responsive meanwhile."""
+        if self.apply_operation is not None:
+            return
+        # Get the current settings from the GUI and write out the ones that
+        # changed since they were loaded or last applied.
+        settings = self.get_updated_settings()
+        changed = changed_settings(self.loaded_settings, settings)
+        self.changed = False
         self.apply.set_sensitive(False)
+        if not changed:
+            return
 
-    @staticmethod
-    def on_window_destroy(*args):
-        """Exit the application when the window is closed."""
-        Gtk.main_quit()
-
-    @staticmethod
-    def on_close_clicked(*args):
-        """Exit the application when the window is closed."""
-        Gtk.main_quit()
+        self.apply_operation = light_locker_commands.operation('apply')
+        self.apply_cancellable = Gio.Cancellable()
+        self.apply_status.set_text(_("Applying…"))
+        self.apply_spinner.start()
+        self.apply_progress.show()
+        self.apply.hide()
+        self.cancel_apply.set_sensitive(True)
+        self.cancel_apply.show()
+
+        thread = threading.Thread(target=self.apply_worker,
+                                  args=(settings, changed,
+                                        self.apply_operation,
+                                        self.apply_cancellable))
+        thread.daemon = True
+        thread.start()
+
+    def apply_worker(self, settings, changed, operation, cancellable):
+        """Write the changed settings and report back to the main loop."""
+        def progress(running):
+            GLib.idle_add(self.apply_progress_cb, running)
+
+        error = None
+        applied = set(changed)
+        try:
+            with operation:
+                if self.client is not None:
+                    self.client.apply(dict((key, settings[key])
+                                           for key in changed), cancellable)
+                else:
+                    self.write_settings(settings, changed, progress)
+        except light_locker_commands.Cancelled:
+            error = _("Apply was cancelled.")
+            applied = set()
+        except WriteError as e:
+            # The other backends were written, remember them as applied.
+            applied -= e.failed_settings()
+            if operation.cancelled.is_set():
+                error = _("Apply was cancelled.")
+            else:
+                error = _("Apply failed: %s") % e
+        except Exception as e:
+            applied = set()
+            if cancellable.is_cancelled():
+                error = _("Apply was cancelled.")
+            else:
+                traceback.print_exc()
+                error = _("Apply failed: %s") % e
+        GLib.idle_add(self.apply_done_cb, settings, applied, error)
+
+    def apply_progress_cb(self, running):
+        """Show the backends being written."""
+        if self.apply_operation is not None and \
+                not self.apply_operation.cancelled.is_set() and running:
+            self.apply_status.set_text(_("Applying: %s") % ", ".join(
+                BACKEND_LABELS.get(backend, backend) for backend in running))
+        return False
 
-    # Process Management
-    @staticmethod
-    def get_process_username(process):
-        """Return the username of the process owner."""
-        p_user = None
+    def apply_done_cb(self, settings, applied, error):
+        """Leave the in-progress state once Apply has finished, applied is
+        the set of settings that were written."""
+        self.apply_operation = None
+        self.apply_cancellable = None
 
-        try:
-            if old_psutil_format:
-                p_user = process.username
-        except Exception:
-            p_user = process.username()
+        if error is None:
+            self.loaded_settings = settings
+        else:
+            loaded = dict(self.loaded_settings)
+            for key in applied:
+                loaded[key] = settings[key]
+            self.loaded_settings = loaded
+            # Keep the changes around for another try.
+            self.changed = True
+
+        if self.quit_pending:
+            if self.instant_apply and self.changed and error is None:
+                self.apply_cb(self.apply)
+            if self.apply_operation is None:
+                Gtk.main_quit()
+            return False
+
+        self.apply_spinner.stop()
+        self.cancel_apply.hide()
+        # With instant-apply, Apply only shows up to retry a failed write.
+        if not self.instant_apply or error is not None:
+            self.apply.show()
+        if error is None:
+            self.apply_progress.hide()
+        else:
+            self.apply_status.set_text(error)
+        self.apply.set_sensitive(self.changed and self.settings_loaded())
 
-        return p_user
+        # Write what changed while this Apply was running.
+        if self.instant_apply and self.changed and error is None:
+            self.schedule_instant_apply()
+        return False
 
-    @staticmethod
-    def get_process_name(process):
-        """Return the name of the running process."""
-        p_name = None
+    def cancel_apply_cb(self, button, data=None):
+        """Cancel the running Apply, killing the command it waits for."""
+        if self.apply_operation is None:
+            return
+        self.apply_status.set_text(_("Cancelling…"))
+        self.cancel_apply.set_sensitive(False)
+        self.apply_operation.cancel()
+        self.apply_cancellable.cancel()
+
+    def window_mapped_cb(self, window, event):
+        """Record the time to the first window map, then check the cached
+        capabilities off the critical path."""
+        light_locker_profile.record('first window map',
+                                    light_locker_profile.start_time)
+        window.disconnect_by_func(self.window_mapped_cb)
+
+        thread = threading.Thread(target=self.recheck_capabilities)
+        thread.daemon = True
+        thread.start()
+        return False
 
+    def recheck_capabilities(self):
+        """Probe the capabilities again on a worker thread, and reload the
+        settings that depend on them if the cached ones were out of
+        date."""
+        import light_locker_capabilities
         try:
-            if old_psutil_format:
-                p_name = os.path.basename(process.exe)
+            changed = light_locker_capabilities.recheck()
         except Exception:
-            p_name = os.path.basename(process.exe())
-
-        return p_name
-
-    def check_running_process(self, process_name):
-        """Return True if the specified process is active."""
-        # Find the process...
-        for pid in psutil.pids():
-            try:
-                p = psutil.Process(pid)
-                if self.get_process_username(p) == username:
-                    # Return True if the process is found.
-                    if self.get_process_name(p) == process_name:
-                        return True
-            except Exception:
-                pass
-
+            traceback.print_exc()
+            return
+        if changed:
+            GLib.idle_add(self.capabilities_changed_cb)
+
+    def capabilities_changed_cb(self):
+        """Reload the settings probed with outdated capabilities, unless the
+        user is editing them."""
+        if self.client is None and self.settings_loaded() and \
+                not self.changed:
+            self.run_probe('lock', self.probe_lock_settings,
+                           self.load_lock_settings)
+            self.run_probe('processes', self.probe_processes,
+                           self.load_process_settings)
         return False
 
-    def stop_light_locker(self):
-        """Safely stop the light-locker process."""
-        # Find the process...
-        for pid in psutil.pids():
-            try:
-                p = psutil.Process(pid)
-                if self.get_process_username(p) == username:
-                    # When found, end the light-locker process.
-                    if self.get_process_name(p) == 'light-locker':
-                        p.terminate()
-            except Exception:
-                pass
+    def on_window_destroy(self, *args):
+        """Exit the application when the window is closed."""
+        self.quit()
 
-    @staticmethod
-    def run_command(cmd, check_output=False):
-        """Run a shell command, return its output."""
-        if len(cmd) == 0:
-            return None
-        if check_output:
-            output = subprocess.check_output(cmd, shell=True)
-            if not isinstance(output, str):
-                output = output.decode('utf-8')
-            return output
+    def on_close_clicked(self, *args):
+        """Exit the application when the window is closed."""
+        self.quit()
+
+    def quit(self):
+        """Exit the application once pending changes are written."""
+        self.flush_instant_apply()
+        if self.apply_operation is not None:
+            # Let the running Apply finish, apply_done_cb() quits.
+            self.quit_pending = True
+            self.window.hide()
         else:
-            subprocess.Popen(cmd.split(" "))
-            return None
+            Gtk.main_quit()
 
     def run_command_cb(self, widget, cmd):
         self.run_command(cmd, False)
 
-    # Light Locker 1.5.1
-    def gsettings_init(self):
-        schema_source = Gio.SettingsSchemaSource.get_default()
-        if schema_source.lookup('apps.light-locker', True):
-            self.gsettings = Gio.Settings.new('apps.light-locker')
-
-    def gsettings_available(self):
-        return self.gsettings is not None
-
-    def gsettings_get_settings(self):
-        lock_after_screensaver = self.gsettings.get_uint('lock-after-screensaver')
-        late_locking = self.gsettings.get_boolean('late-locking')
-        lock_on_suspend = self.gsettings.get_boolean('lock-on-suspend')
-
-        settings = dict()
-        settings['light-locker-enabled'] = self.get_light_locker_enabled()
-        settings['lock-after-screensaver'] = lock_after_screensaver > 0
-        settings['late-locking'] = late_locking
-        settings['lock-on-suspend'] = lock_on_suspend
-        settings['lock-time'] = self.light_locker_time_down_scaler(lock_after_screensaver)
-
-        return settings
-
-    def gsettings_set_enabled(self, enable):
-        if enable:
-            light_locker_exec = "light-locker"
-        else:
-            light_locker_exec = ""
-        keyfile = self.get_light_locker_autostart()
-        keyfile.set_value("Desktop Entry", "Exec", light_locker_exec)
-        self.save_light_locker_autostart()
-
-    def gsettings_set_late_locking(self, enable):
-        self.gsettings.set_boolean("late-locking", enable)
-
-    def gsettings_set_lock_after_screensaver(self, value):
-        self.gsettings.set_uint("lock-after-screensaver", value)
-
-    def gsettings_set_lock_on_suspend(self, enable):
-        self.gsettings.set_boolean("lock-on-suspend", enable)
-
-    # Key Files
-    def ll_keyfile_get_settings(self):
-        # Defaults
-        settings = {}
-
-        keyfile = self.get_light_locker_autostart()
-        if self.get_light_locker_enabled():
-            settings['light-locker-enabled'] = True
-        else:
-            settings['light-locker-enabled'] = False
-
-        ll_exec = keyfile.get_value("Desktop Entry", "Exec")
-        value = ll_exec.replace("=", " ")
-        splitargs = shlex.split(value)
-
-        parser = argparse.ArgumentParser(description='Light Locker Settings')
-        parser.add_argument("--lock-after-screensaver", action='store_true')
-        parser.add_argument("--late-locking", action='store_true')
-        parser.add_argument("--lock-on-suspend", action='store_true')
-        (args, others) = parser.parse_known_args(splitargs)
-
-        # Lock after screensaver
-        if args.lock_after_screensaver:
-            if int(args.lock_after_screensaver) != 0:
-                settings['lock-after-screensaver'] = True
-                settings['lock-time'] = self.light_locker_time_down_scaler(
-                    int(args.lock_after_screensaver))
-            else:
-                settings['lock-after-screensaver'] = False
-                settings['lock-time'] = 0
-
-        # Late Locking
-        if args.late_locking:
-            settings['late-locking'] = True
-        else:
-            settings['late-locking'] = False
-
-        # Lock on Suspend
-        if args.lock_on_suspend:
-            settings['lock-on-suspend'] = True
-        else:
-            settings['lock-on-suspend'] = False
-
-        return settings
-
-    @staticmethod
-    def get_autostart(filename, defaults=None):
-        if not defaults:
-            defaults = {}
-        autostart = os.path.join(GLib.get_user_config_dir(), 'autostart')
-        if not os.path.exists(autostart):
-            os.makedirs(autostart)
-        keyfile = GLib.KeyFile.new()
-
-        dirs = [autostart]
-        for directory in (GLib.get_system_config_dirs()):
-            dirs.append(os.path.join(directory, 'autostart'))
+    def autostart_changed_cb(self, filename):
+        """Reload the lock settings after light-locker.desktop was changed
+        by another program, unless the user is editing them."""
+        self.light_locker_keyfile = None
+        if self.settings_loaded() and not self.changed:
+            self.run_probe('lock', self.probe_lock_settings,
+                           self.load_lock_settings)
+
+    def gsettings_changed_cb(self, settings, key):
+        """Follow changes of the light-locker GSettings made by other
+        programs, unless the user is editing the lock settings."""
+        if self.changed or not self.settings_loaded():
+            return
 
+        self.loading = True
         try:
-            keyfile.load_from_dirs(filename, dirs,
-                                   GLib.KeyFileFlags.KEEP_TRANSLATIONS)
-        except GLib.Error:
-            pass
-
-        for key in defaults.keys():
-            try:
-                if keyfile.get_value("Desktop Entry", key) is None:
-                    keyfile.set_value("Desktop Entry", key, defaults[key])
-            except GLib.Error:
-                keyfile.set_value("Desktop Entry", key, defaults[key])
-
-        return keyfile
-
-    def get_light_locker_autostart(self):
-        if self.light_locker_keyfile is not None:
-            return self.light_locker_keyfile
-
-        defaults = {
-            "Type": "Application",
-            "Name": _("Screen Locker"),
-            "Comment": _("Launch screen locker program"),
-            "Icon": "preferences-desktop-screensaver",
-            "NoDisplay": "true",
-            "NotShownIn": "Unity",
-            "Exec": "light-locker"
-        }
-
-        self.light_locker_keyfile = \
-            self.get_autostart('light-locker.desktop', defaults)
-
-        return self.light_locker_keyfile
-
-    def get_screensaver_autostart(self):
-        if self.screensaver_keyfile is not None:
-            return self.screensaver_keyfile
-
-        defaults = {
-            "Type": "Application",
-            "Name": _("Screensaver"),
-            "Comment": _("Set screensaver timeouts"),
-            "Exec": ""
-        }
-
-        self.screensaver_keyfile = \
-            self.get_autostart('screensaver-settings.desktop', defaults)
-        return self.screensaver_keyfile
-
-    def save_light_locker_autostart(self):
-        filename = os.path.join(GLib.get_user_config_dir(), 'autostart',
-                                'light-locker.desktop')
-        autostart = self.get_light_locker_autostart()
-        autostart.save_to_file(filename)
-
-    def save_screensaver_autostart(self):
-        filename = os.path.join(GLib.get_user_config_dir(), 'autostart',
-                                'screensaver-settings.desktop')
-        autostart = self.get_screensaver_autostart()
-        autostart.save_to_file(filename)
+            if key == 'lock-on-suspend':
+                # xfce4-power-manager takes precedence for lock-on-suspend.
+                if self.xfpm_lock_on_suspend is None:
+                    self.lock_on_suspend.set_active(settings.get_boolean(key))
+            elif key in ['lock-after-screensaver', 'late-locking']:
+                lock_after_screensaver = settings.get_uint(
+                    'lock-after-screensaver')
+                if lock_after_screensaver > 0:
+                    self.lock_delay.set_value(
+                        self.light_locker_time_down_scaler(
+                            lock_after_screensaver))
+                    self.lock_delay.set_sensitive(True)
+                    if settings.get_boolean('late-locking'):
+                        self.session_lock_combo.set_active(1)
+                    else:
+                        self.session_lock_combo.set_active(0)
+                else:
+                    self.lock_delay.set_sensitive(False)
+                    self.session_lock_combo.set_active(2)
+        finally:
+            self.loading = False
+
+        self.loaded_settings = self.get_updated_settings()
 
     # Settings Parsing
     def use_screensaver_manager(self, name, command):
-        """Replace the Screensaver settings with a different application."""
+        """Replace the Screensaver settings with a different application.
+        Later probes find the same manager, the infobar is only set up
+        once."""
+        if self.screensaver_managed:
+            return
         self.screensaver_managed = True
 
         infobar = self.builder.get_object("screensaver_info")
@@ -432,10 +495,7 @@ class LightLockerSettings:
         screensaver_frame = self.builder.get_object("screensaver_details")
 
         # Light Locker Settings is *NOT* controlling the screensaver.
-        filename = os.path.join(GLib.get_user_config_dir(), 'autostart',
-                                'screensaver-settings.desktop')
-        if os.path.isfile(filename):
-            os.remove(filename)
+        self.remove_screensaver_autostart()
         screensaver_frame.hide()
 
         # Update the InfoBar
@@ -444,40 +504,144 @@ class LightLockerSettings:
         infobar_button.connect("clicked", self.run_command_cb, command)
         infobar.show()
 
+    # Settings Loading
     def init_settings(self):
-        if self.gsettings_available():
-            settings = self.gsettings_get_settings()
-            ll_exec_settings = self.ll_keyfile_get_settings()
-            if 'lock-after-screensaver' in ll_exec_settings and ll_exec_settings['lock-after-screensaver']:
-                settings['lock-after-screensaver'] = True
-            if 'late-locking' in ll_exec_settings and ll_exec_settings['late-locking']:
-                settings['late-locking'] = True
-            if 'lock-on-suspend' in ll_exec_settings and ll_exec_settings['lock-on-suspend']:
-                settings['lock-on-suspend'] = True
-            if 'lock-time' in ll_exec_settings and ll_exec_settings['lock-time'] != 10:
-                settings['lock-time'] = ll_exec_settings['lock-time']
-        else:
-            settings = self.ll_keyfile_get_settings()
+        """Gather the current settings. The independent probes run
+        concurrently on worker threads, each group of controls stays
+        insensitive until the probes feeding it have returned."""
+        self.xfpm_lock_on_suspend = None
+
+        self.locking_frame.set_sensitive(False)
+        self.screensaver_frame.set_sensitive(False)
+
+        if self.client is not None:
+            self.run_probe('daemon', self.probe_daemon,
+                           self.load_daemon_settings)
+            return
 
-        # Replace settings with xfce4-power-manager
-        if self.check_running_process("xfce4-power-manager"):
-            xfpm_sync = light_locker_xfsync.XfpmSync()
-            settings['lock-on-suspend'] = xfpm_sync.get_lock()
+        self.run_probe('lock', self.probe_lock_settings,
+                       self.load_lock_settings)
+        self.run_probe('processes', self.probe_processes,
+                       self.load_process_settings)
+        self.run_probe('screen-blank', self.get_screen_blank_timeout,
+                       self.load_screen_blank_settings)
+
+    def settings_loaded(self):
+        """Return True once every startup probe has returned."""
+        return {'lock', 'processes', 'screen-blank'} <= self.probes_done
+
+    def run_probe(self, name, probe, callback):
+        """Run probe on a worker thread and pass its result to callback on
+        the main loop."""
+        def worker():
+            try:
+                with light_locker_commands.operation('startup: ' + name):
+                    result = probe()
+            except Exception:
+                traceback.print_exc()
+                result = None
+            GLib.idle_add(self.probe_done_cb, name, callback, result)
 
-        # Check if any known screensaver managers are currently running.
-        for process_name in screensaver_managers.keys():
-            if self.check_running_process(process_name):
-                name, command = screensaver_managers[process_name]
-                self.use_screensaver_manager(name, command)
-                break
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
 
+    def probe_done_cb(self, name, callback, result):
+        """Update the controls with the result of a finished probe."""
+        self.loading = True
+        try:
+            if result is not None:
+                callback(result)
+        finally:
+            self.loading = False
+
+        self.probes_done.add(name)
+        self.locking_frame.set_sensitive(
+            {'lock', 'processes'} <= self.probes_done)
+        self.screensaver_frame.set_sensitive(
+            {'processes', 'screen-blank'} <= self.probes_done)
+        if self.settings_loaded():
+            # Remember what was loaded, Apply only writes the differences.
+            self.loaded_settings = self.get_updated_settings()
+
+        self.apply.set_sensitive(self.changed and self.settings_loaded())
+        if self.instant_apply and self.changed and self.settings_loaded():
+            self.schedule_instant_apply()
+        return False
+
+    def probe_daemon(self):
+        """Return all settings from the daemon, or an empty dictionary if it
+        cannot be reached."""
+        try:
+            return self.client.get_all()
+        except GLib.Error:
+            traceback.print_exc()
+            return dict()
+
+    def load_daemon_settings(self, settings):
+        """Update all controls with the settings served by the daemon, or
+        probe the backends directly if it could not be reached."""
+        if not settings:
+            self.client = None
+            self.init_settings()
+            return
+
+        self.daemon_settings = settings
+        self.fill_from_daemon()
+        self.probes_done.update(['lock', 'processes', 'screen-blank'])
+        self.client.subscribe(self.daemon_changed_cb)
+
+    def fill_from_daemon(self):
+        """Update the controls from the daemon settings, which use the
+        units of the command line."""
+        settings = self.daemon_settings
+        lock_after_screensaver = settings['lock-after-screensaver']
+        # Without a lock delay the slider keeps its default position.
+        lock_time = 10
+        if lock_after_screensaver > 0:
+            lock_time = self.light_locker_time_down_scaler(
+                lock_after_screensaver)
+        self.load_lock_settings({
+            'light-locker-enabled': settings['lock-enabled'],
+            'lock-after-screensaver': lock_after_screensaver > 0,
+            'late-locking': settings['late-locking'],
+            'lock-on-suspend': settings['lock-on-suspend'],
+            'lock-time': lock_time
+        })
+        if 'screensaver-manager' in settings and not self.screensaver_managed:
+            self.load_process_settings({
+                'screensaver-manager': tuple(settings['screensaver-manager'])
+            })
+        self.load_screen_blank_settings(
+            (settings['screen-blank-timeout'] / 60,
+             settings['screen-off-timeout'] / 60))
+
+    def daemon_changed_cb(self, changes):
+        """Follow the changes announced by the daemon, unless the user is
+        editing the settings."""
+        self.daemon_settings.update(changes)
+        if self.changed or not self.settings_loaded():
+            return
+
+        self.loading = True
+        try:
+            self.fill_from_daemon()
+        finally:
+            self.loading = False
+        self.loaded_settings = self.get_updated_settings()
+
+    def load_lock_settings(self, settings):
+        """Update the lock controls."""
         # Extract the settings
         use_light_locker = settings['light-locker-enabled']
         lock_after_screensaver = settings['lock-after-screensaver']
         late_locking = settings['late-locking']
         lock_on_suspend = settings['lock-on-suspend']
         lock_time = settings['lock-time']
-        screen_blank_timeout, screen_off_timeout = self.get_screen_blank_timeout()
+
+        # xfce4-power-manager takes precedence for lock-on-suspend.
+        if self.xfpm_lock_on_suspend is not None:
+            lock_on_suspend = self.xfpm_lock_on_suspend
 
         # Apply the settings
         self.use_lightlocker.set_active(use_light_locker)
@@ -498,63 +662,78 @@ class LightLockerSettings:
 
         self.lock_on_suspend.set_active(lock_on_suspend)
 
+        # Update the controls when the GSettings change, instead of reading
+        # them again.
+        if self.gsettings_available() and self.gsettings_handler is None:
+            self.gsettings_handler = self.gsettings.connect(
+                "changed", self.gsettings_changed_cb)
+
+    def load_process_settings(self, settings):
+        """Update the controls owned by other running applications."""
+        if 'lock-on-suspend' in settings:
+            self.xfpm_lock_on_suspend = settings['lock-on-suspend']
+            self.lock_on_suspend.set_active(self.xfpm_lock_on_suspend)
+
+        if 'screensaver-manager' in settings:
+            name, command = settings['screensaver-manager']
+            self.use_screensaver_manager(name, command)
+
+    def load_screen_blank_settings(self, timeouts):
+        """Update the screen blank controls."""
+        screen_blank_timeout, screen_off_timeout = timeouts
         blank = self.light_locker_time_down_scaler(screen_blank_timeout)
         off = self.light_locker_time_down_scaler(screen_off_timeout)
         self.screenblank_timeout.set_value(blank)
         self.screenoff_timeout.set_value(off)
 
-    def get_light_locker_enabled(self):
-        keyfile = self.get_light_locker_autostart()
-        ll_exec = keyfile.get_value("Desktop Entry", "Exec")
-        return "light-locker" in ll_exec
-
-    def get_screen_blank_timeout(self):
-        """ read in the X11 screensaver settings from bash """
-        # Defaults
-        screen_blank = 10
-        screen_off = 15
-
-        # Get the xset output to parse.
-        screensaver_output = self.run_command('xset q', check_output=True)
-
-        # Get the Screen-Blank timeout
-        screenblank_timeout_grep = re.search(
-            "timeout: *(\d+)", screensaver_output)
-        if screenblank_timeout_grep:
-            screenblank_timeout = re.findall(
-                '\d+', screenblank_timeout_grep.group(1))
-            screen_blank = int(screenblank_timeout[0]) / 60
-
-        # Get the Screen-Off timeout
-        screenoff_timeout_grep = re.search(
-            "Standby: *(\d+)", screensaver_output)
-        if screenoff_timeout_grep:
-            screenoff_timeout = re.findall(
-                '\d+', screenoff_timeout_grep.group(1))
-            screen_off = int(screenoff_timeout[0]) / 60
-
-        # Return the current timeout settings
-        return screen_blank, screen_off
-
     # Label Formatters
-    @staticmethod
-    def screensaver_label_formatter(screenblank_timeout, max_value):
+    # The labels of every slider position as (locale, screensaver labels,
+    # light-locker labels), the formatters run on every redraw.
+    label_tables = (None, [], [])
+
+    @classmethod
+    def get_label_tables(cls):
+        """Return the screensaver and light-locker labels of the slider
+        positions, building them again when the locale changed."""
+        locale = tuple(os.environ.get(name) for name in LOCALE_VARIABLES)
+        if cls.label_tables[0] != locale:
+            positions = range(SLIDER_MAX + 1)
+            cls.label_tables = (
+                locale,
+                [cls.minutes_to_readable(value) for value in positions],
+                [cls.lock_delay_to_readable(value) for value in positions])
+        return cls.label_tables[1:]
+
+    @classmethod
+    def screensaver_label_formatter(cls, screenblank_timeout, max_value):
         """Convert timeout values to a more friendly format."""
         value = int(screenblank_timeout.get_value())
-        if value == 0:
-            return _("Never")
-        else:
-            return ngettext("%d minute", "%d minutes", value) % (value,)
+        labels = cls.get_label_tables()[0]
+        if 0 <= value < len(labels):
+            return labels[value]
+        return cls.minutes_to_readable(value)
 
     def light_locker_label_formatter(self, light_locker_slider, max_value):
         """Convert timeout values to a more friendly format."""
         value = int(light_locker_slider.get_value())
+        labels = self.get_label_tables()[1]
+        if 0 <= value < len(labels):
+            return labels[value]
+        return self.lock_delay_to_readable(value)
+
+    @staticmethod
+    def minutes_to_readable(minutes):
+        """Convert a screensaver slider position to a friendly format."""
+        if minutes == 0:
+            return _("Never")
+        return ngettext("%d minute", "%d minutes", minutes) % (minutes,)
+
+    @classmethod
+    def lock_delay_to_readable(cls, value):
+        """Convert a lock delay slider position to a friendly format."""
         if value == 0:
-            formatted_string = _("Never")
-        else:
-            value = self.light_locker_time_up_scaler(value)
-            formatted_string = self.secs_to_readable(value)
-        return formatted_string
+            return _("Never")
+        return cls.secs_to_readable(cls.light_locker_time_up_scaler(value))
 
     @staticmethod
     def secs_to_readable(seconds):
@@ -565,22 +744,6 @@ class LightLockerSettings:
         else:
             return ngettext("%d second", "%d seconds", seconds) % (seconds,)
 
-            # Time Scalers
-
-    @staticmethod
-    def light_locker_time_up_scaler(time):
-        """Scale times up."""
-        if time > 60:
-            time = (time - 60) * 60
-        return time
-
-    @staticmethod
-    def light_locker_time_down_scaler(time):
-        """Scale times down."""
-        if time > 60:
-            time = time / 60 + 60
-        return time
-
     # Settings Writing
     def get_updated_settings(self):
         """Return a dictionary with the updated settings from the GUI."""
@@ -618,91 +781,34 @@ class LightLockerSettings:
 
         return settings
 
-    def apply_settings(self):
-        """Apply updated settings."""
-        # Get the current settings from the GUI.
-        settings = self.get_updated_settings()
-        lock_on_suspend = settings['lock-on-suspend']
-
-        # If xfce4-sesssion is running, sync the lock-on-suspend setting.
-        if self.check_running_process("xfce4-session"):
-            session_sync = light_locker_xfsync.XfceSessionSync()
-            session_sync.set_lock(lock_on_suspend)
-
-        # If xfpm manages locking, disable it for light-locker.
-        if self.check_running_process("xfce4-power-manager"):
-            xfpm_sync = light_locker_xfsync.XfpmSync()
-            xfpm_sync.set_lock(lock_on_suspend)
-
-        # Apply the remaining settings to light-locker.
-        self.apply_light_locker_settings(settings)
-
-        if not self.screensaver_managed:
-            self.apply_screen_blank_settings(settings)
 
-    def apply_light_locker_settings(self, settings):
-        """Apply the light-locker settings"""
-        lock_enabled = settings['lock-enabled']
-        late_locking = settings['late-locking']
-        lock_on_suspend = settings['lock-on-suspend']
-        lock_after_screensaver = settings['lock-after-screensaver']
-
-        # If GSettings is available, prefer the following method.
-        if self.gsettings_available():
-            self.gsettings_set_enabled(lock_enabled)
-            self.gsettings_set_late_locking(late_locking)
-            self.gsettings_set_lock_after_screensaver(lock_after_screensaver)
-            self.gsettings_set_lock_on_suspend(lock_on_suspend)
-            return
-
-        # Else, proceed with the legacy code below
-        # Stop any running light-locker processes.
-        self.stop_light_locker()
-
-        if late_locking:
-            late_locking = "--late-locking"
-        else:
-            late_locking = "--no-late-locking"
-
-        if lock_on_suspend:
-            lock_on_suspend = "--lock-on-suspend"
-        else:
-            lock_on_suspend = "--no-lock-on-suspend"
-
-        lock_after_screensaver = "--lock-after-screensaver=%i" % lock_after_screensaver
-
-        # Build the light-locker command.
-        light_locker_exec = ""
-        if lock_enabled:
-            light_locker_exec = \
-                "light-locker %s %s %s" % (lock_after_screensaver,
-                                           lock_on_suspend, late_locking)
-
-        # Save the light-locker autostart file.
-        keyfile = self.get_light_locker_autostart()
-        keyfile.set_value("Desktop Entry", "Exec", light_locker_exec)
-        self.save_light_locker_autostart()
-
-        # Execute the updated light-locker command.
-        self.run_command(light_locker_exec)
-
-    def apply_screen_blank_settings(self, settings):
-        """Apply the screen blank settings."""
-        screenblank_timeout = settings['screen-blank-timeout']
-        screenoff_timeout = settings['screen-off-timeout']
-
-        # Build the screen-blank/off command.
-        screensaver_exec = "xset s {0} dpms {1} {1} {1}".format(screenblank_timeout, screenoff_timeout)
-
-        # Execute the updated screensaver command.
-        self.run_command(screensaver_exec)
-
-        # Save the screensaver autostart file.
-        keyfile = self.get_screensaver_autostart()
-        keyfile.set_value("Desktop Entry", "Exec", screensaver_exec)
-        self.save_screensaver_autostart()
+def main(argv):
+    """Run the settings window, or the headless mode if any of its options
+    were given."""
+    instant_apply = False
+
+    # Plain launches skip argparse altogether.
+    if argv:
+        args = light_locker_cli.parse_args(argv)
+        if args.profile_startup:
+            light_locker_profile.enable()
+        if args.trace:
+            light_locker_commands.set_trace_file(args.trace)
+        if light_locker_cli.is_headless(args):
+            return light_locker_cli.run(args)
+        if args.daemon:
+            import light_locker_daemon
+            return light_locker_daemon.run()
+        instant_apply = args.instant_apply
+
+    global Gtk
+    from gi.repository import Gtk
+    light_locker_profile.record('imports', light_locker_profile.start_time)
+
+    LightLockerSettings(instant_apply)
+    Gtk.main()
+    return 0
 
 
 if __name__ == "__main__":
-    main = LightLockerSettings()
-    Gtk.main()
+    sys.exit(main(sys.argv[1:]))
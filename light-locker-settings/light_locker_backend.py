@@ -0,0 +1,910 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#   Copyright © 2014-2015 Thomas Molloy <beetyrootey@gmail.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from gettext import gettext as _
+
+import errno
+import os
+import threading
+from gi.repository import GLib, Gio
+
+import light_locker_profile
+from light_locker_profile import timed
+
+# psutil, the xfconf and X11 helpers and the parsing modules are imported on
+# first use, most code paths never need them.
+psutil = None
+old_psutil_format = None
+
+''' Settings backends for the light-locker, shared by the settings window
+and the headless command line mode. Nothing in here may import Gtk. '''
+
+# The settings written by apply_light_locker_settings() and
+# apply_screen_blank_settings() respectively.
+LOCK_SETTINGS = ('lock-enabled', 'late-locking', 'lock-after-screensaver',
+                 'lock-on-suspend')
+SCREEN_BLANK_SETTINGS = ('screen-blank-timeout', 'screen-off-timeout')
+
+# The settings each backend stores.
+BACKEND_SETTINGS = {
+    'xfce4-session': ('lock-on-suspend',),
+    'xfce4-power-manager': ('lock-on-suspend',),
+    'light-locker': LOCK_SETTINGS,
+    'screen-blank': SCREEN_BLANK_SETTINGS
+}
+
+# Backends written at the same time by write_settings().
+MAX_WRITERS = 4
+
+# Seconds the commands writing each backend may take together.
+BACKEND_TIMEOUTS = {
+    'xfce4-session': 5,
+    'xfce4-power-manager': 5,
+    'light-locker': 10,
+    'screen-blank': 5
+}
+
+# Highest position of the time sliders. Lock delay positions up to 60 are
+# seconds, the ones above are minutes counted from 61.
+SLIDER_MAX = 120
+
+screensaver_managers = {
+    'xfce4-power-manager': (_("Xfce Power Manager"), "xfce4-power-manager -c")
+}
+
+# Resolved autostart files, by filename: (user file signature, resolved path,
+# resolved file signature, contents). Entries of monitored files are trusted
+# until the monitor reports a change, the others are checked with a stat.
+_autostart_cache = dict()
+_autostart_monitors = dict()
+_autostart_lock = threading.Lock()
+
+
+class GSettingsError(Exception):
+    """Raised when light-locker GSettings keys could not be written."""
+    def __init__(self, keys):
+        Exception.__init__(self, "GSettings keys not writable: %s" %
+                           ", ".join(keys))
+        self.keys = keys
+
+
+class WriteError(Exception):
+    """Raised by LightLockerBackend.write_settings() when some backends
+    could not be written. failures maps those backends to their exception,
+    written is the set of backends that were written."""
+    def __init__(self, failures, written):
+        Exception.__init__(self, "; ".join(
+            "%s: %s" % (backend, failures[backend])
+            for backend in sorted(failures)))
+        self.failures = failures
+        self.written = written
+
+    def failed_settings(self):
+        """Return the set of settings not stored by every backend."""
+        failed = set()
+        for backend in self.failures:
+            failed.update(BACKEND_SETTINGS[backend])
+        return failed
+
+
+def changed_settings(old, new):
+    """Return the set of keys whose values differ between the settings
+    dictionaries old and new."""
+    return set(key for key in new if old.get(key) != new[key])
+
+
+def _time_up(time):
+    if time > 60:
+        time = (time - 60) * 60
+    return time
+
+
+def _time_down(time):
+    if time > 60:
+        time = time / 60 + 60
+    return time
+
+
+# The time scalers over the slider range, slider positions to seconds and
+# the seconds they produce back to positions.
+_time_up_table = dict((position, _time_up(position))
+                      for position in range(SLIDER_MAX + 1))
+_time_down_table = dict((seconds, _time_down(seconds))
+                        for seconds in _time_up_table.values())
+
+
+def light_locker_autostart_defaults():
+    """Return the keys of a new light-locker.desktop."""
+    return {
+        "Type": "Application",
+        "Name": _("Screen Locker"),
+        "Comment": _("Launch screen locker program"),
+        "Icon": "preferences-desktop-screensaver",
+        "NoDisplay": "true",
+        "NotShownIn": "Unity",
+        "Exec": "light-locker"
+    }
+
+
+def screensaver_autostart_defaults():
+    """Return the keys of a new screensaver-settings.desktop."""
+    return {
+        "Type": "Application",
+        "Name": _("Screensaver"),
+        "Comment": _("Set screensaver timeouts"),
+        "Exec": ""
+    }
+
+
+def get_light_locker_exec(settings, current=None):
+    """Return the light-locker command line for the settings in the form
+    taken by LightLockerBackend.write_settings(), empty if locking is
+    disabled. If current is a light-locker command line, it is updated,
+    keeping the arguments not managed here."""
+    import light_locker_cmdline
+
+    if not settings['lock-enabled']:
+        return ""
+
+    ll_exec = light_locker_cmdline.parse(current or "")
+    if ll_exec.command_index() is None:
+        ll_exec = light_locker_cmdline.parse("light-locker")
+    ll_exec.set('lock-after-screensaver', settings['lock-after-screensaver'])
+    ll_exec.set('lock-on-suspend', settings['lock-on-suspend'])
+    ll_exec.set('late-locking', settings['late-locking'])
+    return str(ll_exec)
+
+
+def get_screensaver_exec(settings):
+    """Return the xset command line setting the screen blank and off
+    timeouts."""
+    return "xset s {0} dpms {1} {1} {1}".format(
+        settings['screen-blank-timeout'], settings['screen-off-timeout'])
+
+
+def load_psutil():
+    """Import psutil on first use and return it."""
+    global psutil, old_psutil_format
+    if psutil is None:
+        import psutil as module
+        old_psutil_format = isinstance(module.Process.username, property)
+        psutil = module
+    return psutil
+
+
+def get_user_autostart_dir():
+    """Return the user's autostart directory."""
+    return os.path.join(GLib.get_user_config_dir(), 'autostart')
+
+
+def get_autostart_dirs():
+    """Return the autostart directories in order of precedence."""
+    dirs = [get_user_autostart_dir()]
+    for directory in (GLib.get_system_config_dirs()):
+        dirs.append(os.path.join(directory, 'autostart'))
+    return dirs
+
+
+def file_signature(path):
+    """Return a value that changes whenever the file at path is replaced or
+    modified, None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size, st.st_ino
+
+
+def _autostart_cache_valid(filename, entry):
+    """Return True if the cache entry for filename is still current."""
+    if filename in _autostart_monitors:
+        return True
+    user_signature, path, path_signature, data = entry
+    user_path = os.path.join(get_user_autostart_dir(), filename)
+    if file_signature(user_path) != user_signature:
+        return False
+    if path is not None and path != user_path:
+        return file_signature(path) == path_signature
+    return True
+
+
+def read_autostart(filename):
+    """Return the contents of the autostart file filename as found in the
+    user's or the system autostart directories, None if there is none."""
+    with _autostart_lock:
+        entry = _autostart_cache.get(filename)
+        if entry is not None and _autostart_cache_valid(filename, entry):
+            return entry[3]
+
+    user_path = os.path.join(get_user_autostart_dir(), filename)
+    user_signature = file_signature(user_path)
+    path = path_signature = data = None
+    for directory in get_autostart_dirs():
+        candidate = os.path.join(directory, filename)
+        try:
+            with open(candidate, 'rb') as autostart:
+                data = autostart.read()
+        except (IOError, OSError):
+            continue
+        path = candidate
+        path_signature = file_signature(candidate)
+        break
+
+    with _autostart_lock:
+        _autostart_cache[filename] = (user_signature, path, path_signature,
+                                      data)
+    return data
+
+
+def _autostart_written(filename, data):
+    """Record a write of data to the user's autostart file filename."""
+    user_path = os.path.join(get_user_autostart_dir(), filename)
+    signature = file_signature(user_path)
+    with _autostart_lock:
+        _autostart_cache[filename] = (signature, user_path, signature, data)
+
+
+def watch_autostart(filename, callback):
+    """Monitor the user's autostart file filename and call callback with
+    filename from the main loop when another program changes it. While
+    monitored, cached reads of the file cost nothing."""
+    if filename in _autostart_monitors:
+        return
+    user_path = os.path.join(get_user_autostart_dir(), filename)
+    monitor = Gio.File.new_for_path(user_path).monitor_file(
+        Gio.FileMonitorFlags.NONE, None)
+
+    def changed_cb(monitor, changed_file, other_file, event_type):
+        if event_type in (Gio.FileMonitorEvent.CHANGED,
+                          Gio.FileMonitorEvent.ATTRIBUTE_CHANGED):
+            # Wait for CHANGES_DONE_HINT.
+            return
+        with _autostart_lock:
+            entry = _autostart_cache.get(filename)
+            if entry is not None and \
+                    entry[0] == file_signature(user_path):
+                # Our own write, the cache is already up to date.
+                return
+            _autostart_cache.pop(filename, None)
+        callback(filename)
+
+    monitor.connect("changed", changed_cb)
+    with _autostart_lock:
+        _autostart_cache.pop(filename, None)
+        _autostart_monitors[filename] = monitor
+
+
+class LightLockerBackend:
+    """Read and write the light-locker and screensaver settings."""
+
+    def __init__(self, gsettings_backend=None):
+        """Initialize the settings backend. gsettings_backend is the
+        Gio.SettingsBackend to use instead of the default one, e.g.
+        Gio.memory_settings_backend_new()."""
+        self.light_locker_keyfile = None
+        self.screensaver_keyfile = None
+        self.screensaver_managed = False
+        self.screensaver_manager = None
+        self.gsettings = None
+        self.gsettings_backend = gsettings_backend
+
+    # Process Management
+    @staticmethod
+    def get_process_uid(process):
+        """Return the real user id of the process owner."""
+        if old_psutil_format:
+            return process.uids.real
+        return process.uids().real
+
+    @staticmethod
+    def get_process_name(process):
+        """Return the name of the running process."""
+        if old_psutil_format:
+            return process.name
+        return process.name()
+
+    @timed('process scan')
+    def get_process_index(self):
+        """Return a dictionary mapping the names of the processes owned by
+        the current user to their PIDs.
+
+        The process table is walked once; build one index per operation and
+        pass it to check_running_process() and stop_light_locker()."""
+        load_psutil()
+        uid = os.getuid()
+        index = dict()
+        for p in psutil.process_iter():
+            try:
+                # Filter by owner first, reading the name of processes
+                # owned by other users is wasted work.
+                if self.get_process_uid(p) != uid:
+                    continue
+                index.setdefault(self.get_process_name(p), []).append(p.pid)
+            except Exception:
+                pass
+
+        return index
+
+    def check_running_process(self, process_name, processes=None):
+        """Return True if the specified process is active."""
+        if processes is None:
+            processes = self.get_process_index()
+        return process_name in processes
+
+    def stop_light_locker(self, processes=None):
+        """Safely stop the light-locker process and wait until it has
+        exited. The process table is only scanned if the running instance
+        cannot be found through its pidfile or bus name."""
+        import light_locker_supervisor
+
+        pids, certain = light_locker_supervisor.find_light_locker()
+        if not certain:
+            if processes is None:
+                processes = self.get_process_index()
+            pids = set(pids).union(processes.get('light-locker', []))
+        light_locker_supervisor.stop(list(pids))
+
+    @staticmethod
+    def run_command(cmd, check_output=False):
+        """Run a command, return its output."""
+        if len(cmd) == 0:
+            return None
+        import light_locker_commands
+        if check_output:
+            return light_locker_commands.run(cmd.split(), output=True)
+        else:
+            light_locker_commands.spawn(cmd.split(" "))
+            return None
+
+    # Light Locker 1.5.1
+    @timed('gsettings probe')
+    def gsettings_init(self):
+        # Keep the existing object, "changed" handlers are connected to it.
+        if self.gsettings is not None:
+            return
+        import light_locker_capabilities
+        # The schema lookup result is cached between runs.
+        if light_locker_capabilities.get()['gsettings-schema']:
+            if self.gsettings_backend is not None:
+                self.gsettings = Gio.Settings.new_with_backend(
+                    'apps.light-locker', self.gsettings_backend)
+            else:
+                self.gsettings = Gio.Settings.new('apps.light-locker')
+
+    def gsettings_available(self):
+        return self.gsettings is not None
+
+    def gsettings_get_settings(self):
+        lock_after_screensaver = self.gsettings.get_uint('lock-after-screensaver')
+        late_locking = self.gsettings.get_boolean('late-locking')
+        lock_on_suspend = self.gsettings.get_boolean('lock-on-suspend')
+
+        settings = dict()
+        settings['light-locker-enabled'] = self.get_light_locker_enabled()
+        settings['lock-after-screensaver'] = lock_after_screensaver > 0
+        settings['late-locking'] = late_locking
+        settings['lock-on-suspend'] = lock_on_suspend
+        settings['lock-time'] = self.light_locker_time_down_scaler(lock_after_screensaver)
+
+        return settings
+
+    def gsettings_set_enabled(self, enable):
+        if enable:
+            light_locker_exec = "light-locker"
+        else:
+            light_locker_exec = ""
+        keyfile = self.get_light_locker_autostart()
+        keyfile.set_value("Desktop Entry", "Exec", light_locker_exec)
+        self.save_light_locker_autostart()
+
+    def gsettings_set_late_locking(self, enable):
+        return self.gsettings.set_boolean("late-locking", enable)
+
+    def gsettings_set_lock_after_screensaver(self, value):
+        return self.gsettings.set_uint("lock-after-screensaver", value)
+
+    def gsettings_set_lock_on_suspend(self, enable):
+        return self.gsettings.set_boolean("lock-on-suspend", enable)
+
+    # Key Files
+    @timed('keyfile load')
+    def ll_keyfile_get_settings(self):
+        import light_locker_cmdline
+
+        # Defaults
+        settings = {}
+
+        keyfile = self.get_light_locker_autostart()
+        if self.get_light_locker_enabled():
+            settings['light-locker-enabled'] = True
+        else:
+            settings['light-locker-enabled'] = False
+
+        ll_exec = light_locker_cmdline.parse(
+            keyfile.get_value("Desktop Entry", "Exec"))
+
+        # Lock after screensaver
+        lock_after_screensaver = ll_exec.get('lock-after-screensaver')
+        if lock_after_screensaver is not None:
+            if lock_after_screensaver != 0:
+                settings['lock-after-screensaver'] = True
+                settings['lock-time'] = self.light_locker_time_down_scaler(
+                    lock_after_screensaver)
+            else:
+                settings['lock-after-screensaver'] = False
+                settings['lock-time'] = 0
+
+        # Late Locking
+        settings['late-locking'] = bool(ll_exec.get('late-locking'))
+
+        # Lock on Suspend
+        settings['lock-on-suspend'] = bool(ll_exec.get('lock-on-suspend'))
+
+        return settings
+
+    @staticmethod
+    def get_autostart(filename, defaults=None):
+        if not defaults:
+            defaults = {}
+        keyfile = GLib.KeyFile.new()
+
+        data = read_autostart(filename)
+        if data is not None:
+            try:
+                keyfile.load_from_data(data.decode('utf-8'), len(data),
+                                       GLib.KeyFileFlags.KEEP_TRANSLATIONS)
+            except (GLib.Error, UnicodeDecodeError):
+                pass
+
+        for key in defaults.keys():
+            try:
+                if keyfile.get_value("Desktop Entry", key) is None:
+                    keyfile.set_value("Desktop Entry", key, defaults[key])
+            except GLib.Error:
+                keyfile.set_value("Desktop Entry", key, defaults[key])
+
+        return keyfile
+
+    def get_light_locker_autostart(self):
+        if self.light_locker_keyfile is not None:
+            return self.light_locker_keyfile
+
+        self.light_locker_keyfile = self.get_autostart(
+            'light-locker.desktop', light_locker_autostart_defaults())
+
+        return self.light_locker_keyfile
+
+    def get_screensaver_autostart(self):
+        if self.screensaver_keyfile is not None:
+            return self.screensaver_keyfile
+
+        self.screensaver_keyfile = self.get_autostart(
+            'screensaver-settings.desktop', screensaver_autostart_defaults())
+        return self.screensaver_keyfile
+
+    @staticmethod
+    def save_autostart(filename, keyfile):
+        """Save keyfile as filename in the user's autostart directory, unless
+        the file on disk already has the same content. The file is replaced
+        atomically. Return True if it was written."""
+        autostart = get_user_autostart_dir()
+        path = os.path.join(autostart, filename)
+
+        data = keyfile.to_data()[0]
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        try:
+            with open(path, 'rb') as current:
+                if current.read() == data:
+                    return False
+        except (IOError, OSError):
+            pass
+
+        # Other backends may be creating the directory at the same time.
+        try:
+            os.makedirs(autostart)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+        # Written to a temporary file and renamed over the old one.
+        GLib.file_set_contents(path, data)
+        _autostart_written(filename, data)
+        return True
+
+    def save_light_locker_autostart(self):
+        autostart = self.get_light_locker_autostart()
+        return self.save_autostart('light-locker.desktop', autostart)
+
+    def save_screensaver_autostart(self):
+        autostart = self.get_screensaver_autostart()
+        return self.save_autostart('screensaver-settings.desktop', autostart)
+
+    def remove_screensaver_autostart(self):
+        """Remove the screensaver autostart file, used when another
+        application manages the screensaver."""
+        filename = os.path.join(get_user_autostart_dir(),
+                                'screensaver-settings.desktop')
+        try:
+            os.remove(filename)
+        except OSError:
+            # Usually already gone, not worth an extra stat to find out.
+            pass
+
+    # Settings Reading
+    def probe_lock_settings(self):
+        """Return the light-locker settings from GSettings and the autostart
+        file."""
+        self.gsettings_init()
+
+        if self.gsettings_available():
+            settings = self.gsettings_get_settings()
+            ll_exec_settings = self.ll_keyfile_get_settings()
+            if 'lock-after-screensaver' in ll_exec_settings and ll_exec_settings['lock-after-screensaver']:
+                settings['lock-after-screensaver'] = True
+            if 'late-locking' in ll_exec_settings and ll_exec_settings['late-locking']:
+                settings['late-locking'] = True
+            if 'lock-on-suspend' in ll_exec_settings and ll_exec_settings['lock-on-suspend']:
+                settings['lock-on-suspend'] = True
+            if 'lock-time' in ll_exec_settings and ll_exec_settings['lock-time'] != 10:
+                settings['lock-time'] = ll_exec_settings['lock-time']
+        else:
+            settings = self.ll_keyfile_get_settings()
+
+        return settings
+
+    def probe_processes(self):
+        """Return the settings that depend on the running session
+        processes."""
+        import light_locker_capabilities
+
+        settings = dict()
+        # Without any of the programs installed the process table need not
+        # be scanned.
+        if not any(light_locker_capabilities.has_program(name) for name in
+                   ['xfce4-power-manager'] + list(screensaver_managers)):
+            return settings
+        processes = self.get_process_index()
+
+        # Replace settings with xfce4-power-manager
+        if self.check_running_process("xfce4-power-manager", processes):
+            import light_locker_xfsync
+            with light_locker_profile.phase('xfconf read'):
+                xfpm_sync = light_locker_xfsync.XfpmSync()
+            settings['lock-on-suspend'] = xfpm_sync.get_lock()
+
+        # Check if any known screensaver managers are currently running.
+        for process_name in screensaver_managers.keys():
+            if self.check_running_process(process_name, processes):
+                settings['screensaver-manager'] = \
+                    screensaver_managers[process_name]
+                break
+
+        return settings
+
+    def get_light_locker_enabled(self):
+        keyfile = self.get_light_locker_autostart()
+        ll_exec = keyfile.get_value("Desktop Entry", "Exec")
+        return "light-locker" in ll_exec
+
+    @timed('xset read')
+    def get_screen_blank_timeout(self):
+        """ read in the X11 screensaver settings from the X server """
+        import light_locker_x11
+        try:
+            screen_blank, screen_off = light_locker_x11.get_screen_timeouts()
+            return screen_blank / 60, screen_off / 60
+        except light_locker_x11.X11Error:
+            return self.get_xset_screen_blank_timeout()
+
+    def get_xset_screen_blank_timeout(self):
+        """ read in the X11 screensaver settings from bash """
+        import re
+        import subprocess
+        import light_locker_commands
+
+        # Defaults
+        screen_blank = 10
+        screen_off = 15
+
+        # Get the xset output to parse. Without a display, or without xset,
+        # the defaults are all there is.
+        try:
+            screensaver_output = self.run_command('xset q', check_output=True)
+        except (subprocess.CalledProcessError, OSError,
+                light_locker_commands.CommandTimeout):
+            return screen_blank, screen_off
+
+        # Get the Screen-Blank timeout
+        screenblank_timeout_grep = re.search(
+            "timeout: *(\d+)", screensaver_output)
+        if screenblank_timeout_grep:
+            screenblank_timeout = re.findall(
+                '\d+', screenblank_timeout_grep.group(1))
+            screen_blank = int(screenblank_timeout[0]) / 60
+
+        # Get the Screen-Off timeout
+        screenoff_timeout_grep = re.search(
+            "Standby: *(\d+)", screensaver_output)
+        if screenoff_timeout_grep:
+            screenoff_timeout = re.findall(
+                '\d+', screenoff_timeout_grep.group(1))
+            screen_off = int(screenoff_timeout[0]) / 60
+
+        # Return the current timeout settings
+        return screen_blank, screen_off
+
+    def get_settings(self, keys=None, write=False):
+        """Return the current settings in the form taken by
+        write_settings(). If keys is given, only the backends holding those
+        settings are read and only they are returned. With write, the
+        settings are about to be written: the screensaver manager is then
+        looked up as well, it decides whether the screen blank settings are
+        written."""
+        if keys is None:
+            keys = LOCK_SETTINGS + SCREEN_BLANK_SETTINGS
+        keys = set(keys)
+        result = dict()
+
+        process_settings = dict()
+        if 'lock-on-suspend' in keys or \
+                (write and keys.intersection(SCREEN_BLANK_SETTINGS)):
+            process_settings = self.probe_processes()
+            self.screensaver_manager = \
+                process_settings.get('screensaver-manager')
+            self.screensaver_managed = self.screensaver_manager is not None
+
+        if keys.intersection(LOCK_SETTINGS):
+            settings = self.probe_lock_settings()
+
+            # xfce4-power-manager takes precedence for lock-on-suspend.
+            lock_on_suspend = settings.get('lock-on-suspend', False)
+            if 'lock-on-suspend' in process_settings:
+                lock_on_suspend = process_settings['lock-on-suspend']
+
+            lock_after_screensaver = 0
+            late_locking = False
+            if settings.get('lock-after-screensaver', False):
+                lock_after_screensaver = self.light_locker_time_up_scaler(
+                    int(settings.get('lock-time', 0)))
+                late_locking = settings.get('late-locking', False)
+
+            result.update({
+                "lock-enabled": settings['light-locker-enabled'],
+                "late-locking": late_locking,
+                "lock-after-screensaver": lock_after_screensaver,
+                "lock-on-suspend": lock_on_suspend
+            })
+
+        if keys.intersection(SCREEN_BLANK_SETTINGS):
+            screen_blank_timeout, screen_off_timeout = \
+                self.get_screen_blank_timeout()
+            result.update({
+                "screen-blank-timeout": int(screen_blank_timeout * 60),
+                "screen-off-timeout": int(screen_off_timeout * 60)
+            })
+
+        return dict((key, value) for key, value in result.items()
+                    if key in keys)
+
+    # Time Scalers
+    @staticmethod
+    def light_locker_time_up_scaler(time):
+        """Scale times up."""
+        try:
+            return _time_up_table[time]
+        except (KeyError, TypeError):
+            return _time_up(time)
+
+    @staticmethod
+    def light_locker_time_down_scaler(time):
+        """Scale times down."""
+        try:
+            return _time_down_table[time]
+        except (KeyError, TypeError):
+            return _time_down(time)
+
+    # Settings Writing
+    def get_write_steps(self, settings, changed=None):
+        """Return the writes storing settings as a list of (backend,
+        function) pairs. If changed is given, only the backends storing one
+        of the keys in changed are written."""
+        import light_locker_capabilities
+        import light_locker_xfsync
+
+        if changed is None:
+            changed = set(settings.keys())
+
+        lock_on_suspend = settings.get('lock-on-suspend')
+        processes = None
+        steps = []
+
+        if 'lock-on-suspend' in changed and \
+                (light_locker_capabilities.has_program('xfce4-session') or
+                 light_locker_capabilities.has_program('xfce4-power-manager')):
+            processes = self.get_process_index()
+
+            # If xfce4-sesssion is running, sync the lock-on-suspend setting.
+            if self.check_running_process("xfce4-session", processes):
+                def sync_session():
+                    session_sync = light_locker_xfsync.XfceSessionSync()
+                    session_sync.set_lock(lock_on_suspend)
+                steps.append(('xfce4-session', sync_session))
+
+            # If xfpm manages locking, disable it for light-locker.
+            if self.check_running_process("xfce4-power-manager", processes):
+                def sync_xfpm():
+                    xfpm_sync = light_locker_xfsync.XfpmSync()
+                    xfpm_sync.set_lock(lock_on_suspend)
+                steps.append(('xfce4-power-manager', sync_xfpm))
+
+        # Apply the remaining settings to light-locker. On the legacy path
+        # this restarts light-locker, so skip it if nothing changed.
+        if changed.intersection(LOCK_SETTINGS):
+            steps.append(('light-locker', lambda:
+                          self.apply_light_locker_settings(settings,
+                                                           processes)))
+
+        if changed.intersection(SCREEN_BLANK_SETTINGS) and \
+                not self.screensaver_managed:
+            steps.append(('screen-blank', lambda:
+                          self.apply_screen_blank_settings(settings)))
+
+        return steps
+
+    def write_settings(self, settings, changed=None, progress=None):
+        """Write settings to the backends. If changed is given, only the
+        backends storing one of the keys in changed are written.
+
+        The backends do not depend on each other and are written at the same
+        time by up to MAX_WRITERS threads. progress is called from those
+        threads with the list of backends being written whenever it changes.
+        Each backend gets BACKEND_TIMEOUTS seconds for its commands, and is
+        abandoned if the running operation is cancelled. Raises WriteError
+        if any backend failed, after all others have been written."""
+        import light_locker_commands
+
+        steps = self.get_write_steps(settings, changed)
+        parents = light_locker_commands.running_operations()
+        lock = threading.Lock()
+        running = []
+        written = set()
+        failures = dict()
+
+        def report(backend, start):
+            with lock:
+                if start:
+                    running.append(backend)
+                else:
+                    running.remove(backend)
+                current = list(running)
+            if progress is not None:
+                progress(current)
+
+        def write_step(step):
+            backend, write = step
+            with light_locker_commands.inherit(parents):
+                report(backend, True)
+                try:
+                    light_locker_commands.check_cancelled()
+                    with light_locker_commands.operation(
+                            backend, BACKEND_TIMEOUTS[backend]):
+                        write()
+                except Exception as error:
+                    with lock:
+                        failures[backend] = error
+                else:
+                    with lock:
+                        written.add(backend)
+                finally:
+                    report(backend, False)
+
+        if len(steps) > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(MAX_WRITERS, len(steps)))
+            try:
+                pool.map(write_step, steps)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for step in steps:
+                write_step(step)
+
+        if failures:
+            raise WriteError(failures, written)
+
+    def apply_light_locker_settings(self, settings, processes=None):
+        """Apply the light-locker settings"""
+        lock_enabled = settings['lock-enabled']
+        late_locking = settings['late-locking']
+        lock_on_suspend = settings['lock-on-suspend']
+        lock_after_screensaver = settings['lock-after-screensaver']
+
+        # If GSettings is available, prefer the following method.
+        if self.gsettings_available():
+            self.gsettings_set_enabled(lock_enabled)
+            # Collect the changes and write them as one dconf transaction,
+            # light-locker then sees a single change instead of three. The
+            # object stays in delay mode, every write here ends in apply().
+            self.gsettings.delay()
+            try:
+                # The setters return False for keys that are not writable,
+                # e.g. locked down by the administrator.
+                written = [
+                    ('late-locking',
+                     self.gsettings_set_late_locking(late_locking)),
+                    ('lock-after-screensaver',
+                     self.gsettings_set_lock_after_screensaver(
+                         lock_after_screensaver)),
+                    ('lock-on-suspend',
+                     self.gsettings_set_lock_on_suspend(lock_on_suspend))
+                ]
+                failed = [key for key, ok in written if not ok]
+                if failed:
+                    raise GSettingsError(failed)
+            except Exception:
+                self.gsettings.revert()
+                raise
+            self.gsettings.apply()
+            return
+
+        # Else, proceed with the legacy code below
+        # Stop any running light-locker processes and wait for them to exit.
+        self.stop_light_locker(processes)
+
+        # Update the light-locker command.
+        keyfile = self.get_light_locker_autostart()
+        light_locker_exec = get_light_locker_exec(
+            settings, keyfile.get_value("Desktop Entry", "Exec"))
+
+        # Save the light-locker autostart file.
+        keyfile.set_value("Desktop Entry", "Exec", light_locker_exec)
+        self.save_light_locker_autostart()
+
+        # Execute the updated light-locker command, wait until it runs.
+        if light_locker_exec:
+            import light_locker_cmdline
+            import light_locker_supervisor
+            light_locker_supervisor.start(
+                light_locker_cmdline.parse(light_locker_exec).argv())
+
+    def apply_screen_blank_settings(self, settings):
+        """Apply the screen blank settings."""
+        import light_locker_x11
+
+        screenblank_timeout = settings['screen-blank-timeout']
+        screenoff_timeout = settings['screen-off-timeout']
+
+        # Build the screen-blank/off command.
+        screensaver_exec = get_screensaver_exec(settings)
+
+        # Update the X server, fall back to running the screensaver command
+        # if it cannot be reached directly. Errors from the X server are
+        # raised here rather than lost in a background xset, after the
+        # autostart file has been saved for the next session.
+        try:
+            light_locker_x11.set_screen_timeouts(screenblank_timeout,
+                                                 screenoff_timeout)
+        except light_locker_x11.X11Unavailable:
+            self.run_command(screensaver_exec)
+        finally:
+            # Save the screensaver autostart file.
+            keyfile = self.get_screensaver_autostart()
+            keyfile.set_value("Desktop Entry", "Exec", screensaver_exec)
+            self.save_screensaver_autostart()
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Cache of the facts about the system that rarely change between runs:
+whether the light-locker GSettings schema is installed and which of the
+session programs the settings are synced with are installed.
+
+The cache lives in $XDG_CACHE_HOME/light-locker-settings/ and is keyed on
+the modification times of the compiled schema files and of the directories in
+$PATH and on the session type, so installing or removing any of them
+invalidates it without looking the programs up. '''
+
+import json
+import os
+import threading
+
+from gi.repository import GLib, Gio
+
+CACHE_VERSION = 1
+
+# Programs whose presence changes what is probed and written.
+PROGRAMS = ('xfce4-power-manager', 'xfce4-session', 'light-locker')
+
+_capabilities = None
+_lock = threading.Lock()
+
+
+def get_cache_file():
+    """Return the path of the cache file."""
+    return os.path.join(GLib.get_user_cache_dir(), 'light-locker-settings',
+                        'capabilities.json')
+
+
+def _mtime(path):
+    """Return the modification time of path, or None if it is missing."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def get_schema_dirs():
+    """Return the directories GSettings loads compiled schemas from."""
+    dirs = []
+    schema_dir = os.environ.get('GSETTINGS_SCHEMA_DIR')
+    if schema_dir:
+        dirs.extend(schema_dir.split(os.pathsep))
+    for data_dir in [GLib.get_user_data_dir()] + \
+            list(GLib.get_system_data_dirs()):
+        dirs.append(os.path.join(data_dir, 'glib-2.0', 'schemas'))
+    return dirs
+
+
+def get_cache_key():
+    """Return the list of facts the cached capabilities depend on."""
+    key = []
+    for schema_dir in get_schema_dirs():
+        path = os.path.join(schema_dir, 'gschemas.compiled')
+        key.append([path, _mtime(path)])
+    # Installing or removing a program changes the mtime of its directory,
+    # one stat per directory instead of a lookup per program.
+    for path_dir in os.environ.get('PATH', '').split(os.pathsep):
+        if path_dir:
+            key.append([path_dir, _mtime(path_dir)])
+    for variable in ('XDG_SESSION_TYPE', 'XDG_CURRENT_DESKTOP'):
+        key.append([variable, os.environ.get(variable)])
+    return key
+
+
+def probe():
+    """Detect the capabilities of the system."""
+    schema_source = Gio.SettingsSchemaSource.get_default()
+    schema = schema_source is not None and \
+        schema_source.lookup('apps.light-locker', True) is not None
+    programs = dict((program, GLib.find_program_in_path(program) is not None)
+                    for program in PROGRAMS)
+    return {'gsettings-schema': schema, 'programs': programs}
+
+
+def load(key):
+    """Return the cached capabilities if they were stored for key."""
+    try:
+        with open(get_cache_file()) as cache:
+            data = json.load(cache)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION or \
+            data.get('key') != key:
+        return None
+    return data.get('capabilities')
+
+
+def save(key, capabilities):
+    """Store capabilities for key, failures only cost the next launch a
+    probe."""
+    path = get_cache_file()
+    data = json.dumps({'version': CACHE_VERSION, 'key': key,
+                       'capabilities': capabilities}, sort_keys=True)
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        GLib.file_set_contents(path, data.encode('utf-8'))
+    except (OSError, GLib.Error):
+        pass
+
+
+def get():
+    """Return the capabilities, probing and caching them on a miss."""
+    global _capabilities
+    with _lock:
+        if _capabilities is None:
+            key = get_cache_key()
+            _capabilities = load(key)
+            if _capabilities is None:
+                _capabilities = probe()
+                save(key, _capabilities)
+        return _capabilities
+
+
+def recheck():
+    """Probe the capabilities again and update the cache, return True if
+    they differ from the ones in use."""
+    global _capabilities
+    key = get_cache_key()
+    capabilities = probe()
+    with _lock:
+        changed = capabilities != _capabilities
+        _capabilities = capabilities
+    if changed or load(key) is None:
+        save(key, capabilities)
+    return changed
+
+
+def has_program(program):
+    """Return True if program is installed."""
+    return get()['programs'].get(program, True)
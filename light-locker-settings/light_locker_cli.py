@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Headless command line mode, reads and writes the settings without
+loading Gtk or the user interface. '''
+
+from gettext import gettext as _
+
+import sys
+
+# The settings available on the command line, in the form taken by
+# LightLockerBackend.write_settings(). Timeouts are in seconds.
+SETTINGS = [
+    ('lock-enabled', bool),
+    ('late-locking', bool),
+    ('lock-after-screensaver', int),
+    ('lock-on-suspend', bool),
+    ('screen-blank-timeout', int),
+    ('screen-off-timeout', int)
+]
+setting_types = dict(SETTINGS)
+
+
+def parse_args(argv):
+    """Parse the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=_("Light Locker Settings"),
+        epilog=_("Settings: %s") % ", ".join(key for key, p_type in SETTINGS))
+    parser.add_argument("--get", metavar="KEY", action='append',
+                        choices=[key for key, p_type in SETTINGS],
+                        help=_("print the value of a setting"))
+    parser.add_argument("--set", metavar="KEY=VALUE", action='append',
+                        help=_("change the value of a setting"))
+    parser.add_argument("--dump", action='store_true',
+                        help=_("print all settings"))
+    parser.add_argument("--provision", metavar="HOMES",
+                        help=_("write the settings given with --set into "
+                               "the home directories listed in the file "
+                               "HOMES, one per line (- for standard input)"))
+    parser.add_argument("--jobs", metavar="N", type=int, default=8,
+                        help=_("home directories provisioned at the same "
+                               "time"))
+    parser.add_argument("--verify", action='store_true',
+                        help=_("compare the settings stored by every "
+                               "backend and print a JSON report, exit "
+                               "with status 1 if they differ"))
+    parser.add_argument("--daemon", action='store_true',
+                        help=_("serve the settings on the session bus"))
+    parser.add_argument("--instant-apply", action='store_true',
+                        help=_("apply changes as they are made, without "
+                               "the Apply button"))
+    parser.add_argument("--profile-startup", action='store_true',
+                        help=_("print the time spent in each startup phase"))
+    parser.add_argument("--trace", metavar="FILE",
+                        help=_("append a JSON line for every external "
+                               "command to FILE"))
+    return parser.parse_args(argv)
+
+
+def is_headless(args):
+    """Return True if the command line asks for the headless mode."""
+    return bool(args.get or args.set or args.dump or args.provision or
+                args.verify)
+
+
+def format_value(value):
+    """Convert a setting value to its command line form."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def parse_value(key, value):
+    """Convert a command line value to the type of the setting key. Raises
+    ValueError if it cannot be converted."""
+    p_type = setting_types[key]
+    if p_type is bool:
+        if value.lower() in ['true', 'yes', 'on', '1']:
+            return True
+        if value.lower() in ['false', 'no', 'off', '0']:
+            return False
+        raise ValueError(value)
+    value = int(value)
+    if value < 0:
+        raise ValueError(value)
+    return value
+
+
+def parse_assignments(assignments):
+    """Return a dictionary of the KEY=VALUE assignments. Raises ValueError
+    with a readable message for invalid ones."""
+    changes = dict()
+    for assignment in assignments:
+        key, sep, value = assignment.partition('=')
+        if not sep or key not in setting_types:
+            raise ValueError(_("Unknown setting: %s") % assignment)
+        try:
+            changes[key] = parse_value(key, value)
+        except ValueError:
+            raise ValueError(_("Invalid value for %s: %s") % (key, value))
+    return changes
+
+
+def update_settings(settings, changes):
+    """Return the settings with changes applied, and the set of keys whose
+    values differ from settings."""
+    from light_locker_backend import changed_settings
+
+    updated = dict(settings)
+    updated.update(changes)
+    # Never locking with the screensaver rules out late locking.
+    if updated.get('lock-after-screensaver') == 0:
+        updated['late-locking'] = False
+    return updated, changed_settings(settings, updated)
+
+
+def group_changed(group, changes):
+    """Return True if changes sets any of the settings in group."""
+    return any(key in changes for key in group)
+
+
+def run(args):
+    """Run the headless mode, return the exit status."""
+    try:
+        changes = parse_assignments(args.set or [])
+    except ValueError as error:
+        sys.stderr.write("%s\n" % error)
+        return 2
+
+    if args.provision:
+        import light_locker_provision
+        return light_locker_provision.run(args.provision, changes, args.jobs)
+
+    if args.verify:
+        import light_locker_verify
+        return light_locker_verify.run()
+
+    import light_locker_commands
+    from light_locker_backend import LOCK_SETTINGS, SCREEN_BLANK_SETTINGS, \
+        LightLockerBackend, WriteError
+
+    # Only read the backends holding the settings asked for, and all
+    # settings written together with the ones changed.
+    keys = set(args.get or [])
+    if args.dump:
+        keys.update(key for key, p_type in SETTINGS)
+    for group in (LOCK_SETTINGS, SCREEN_BLANK_SETTINGS):
+        if group_changed(group, changes):
+            keys.update(group)
+
+    backend = LightLockerBackend()
+    with light_locker_commands.operation('probe'):
+        settings = backend.get_settings(keys, write=bool(changes))
+
+    if changes:
+        settings, changed = update_settings(settings, changes)
+        if changed:
+            try:
+                with light_locker_commands.operation('apply'):
+                    backend.write_settings(settings, changed)
+            except WriteError as error:
+                sys.stderr.write("%s\n" % error)
+                return 1
+
+    if args.dump:
+        for key, p_type in SETTINGS:
+            sys.stdout.write("%s=%s\n" % (key, format_value(settings[key])))
+
+    for key in args.get or []:
+        sys.stdout.write("%s\n" % format_value(settings[key]))
+
+    return 0
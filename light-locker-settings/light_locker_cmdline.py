@@ -0,0 +1,169 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Parser and serializer for the light-locker command line in the Exec key
+of light-locker.desktop.
+
+The line is split once into its words and the whitespace between them, and
+the options light-locker-settings manages are read from and written into
+that list in place. Unchanged lines therefore serialize to exactly the text
+they were parsed from, and unknown arguments, their order, quoting and the
+"--x=N" or "--x N" form of an option all survive an update. As with
+light-locker itself, the last occurrence of an option wins. '''
+
+import os
+import re
+
+# Options taking a number, and boolean options which have a --no- form.
+VALUE_OPTIONS = ('lock-after-screensaver',)
+BOOLEAN_OPTIONS = ('late-locking', 'lock-on-suspend')
+
+# A word runs up to unquoted whitespace, quotes may contain whitespace.
+_token_re = re.compile(r"""(\s+)|((?:[^\s'"\\]|\\.|'[^']*'|"""
+                       r""""(?:[^"\\]|\\.)*"|["'\\])+)""")
+_option_re = re.compile(r'--(no-)?([a-z-]+)(?:=(.*))?$', re.S)
+
+
+def unquote(word):
+    """Return the word with its quotes and backslash escapes removed."""
+    if not any(c in word for c in '\'"\\'):
+        return word
+    result = []
+    quote = None
+    i = 0
+    while i < len(word):
+        c = word[i]
+        if quote is None and c in '\'"':
+            quote = c
+        elif c == quote:
+            quote = None
+        elif c == '\\' and quote != "'" and i + 1 < len(word):
+            i += 1
+            result.append(word[i])
+        else:
+            result.append(c)
+        i += 1
+    return ''.join(result)
+
+
+class ExecLine:
+    """A parsed light-locker command line."""
+
+    def __init__(self, text=''):
+        # Alternating separators and words, starting and ending with a
+        # (possibly empty) separator: parts[1::2] are the words.
+        self.parts = ['']
+        for space, word in _token_re.findall(text):
+            if space:
+                self.parts[-1] += space
+            else:
+                self.parts.append(word)
+                self.parts.append('')
+
+    def __str__(self):
+        return ''.join(self.parts)
+
+    def words(self):
+        """Return the words of the command line as written."""
+        return self.parts[1::2]
+
+    def argv(self):
+        """Return the argument list the command line runs."""
+        return [unquote(word) for word in self.words()]
+
+    def command_index(self):
+        """Return the index into self.parts of the light-locker word, which
+        may follow a wrapper such as "env LANG=C", or None if light-locker
+        is not run."""
+        for i in range(1, len(self.parts), 2):
+            if os.path.basename(unquote(self.parts[i])) == 'light-locker':
+                return i
+        return None
+
+    def _find(self, option):
+        """Return (index, value) of the last occurrence of option, with
+        index into self.parts and value the text of its value (None for a
+        boolean option, False for its --no- form). index is None if the
+        option is not given, value is None for a value option given
+        without one."""
+        found = (None, None)
+        words = self.parts
+        command = self.command_index()
+        i = (command if command is not None else 1) + 2
+        while i < len(words):
+            match = _option_re.match(unquote(words[i]))
+            if match is not None and match.group(2) == option:
+                if option in VALUE_OPTIONS:
+                    if match.group(3) is not None:
+                        found = (i, match.group(3))
+                    elif i + 2 < len(words) and \
+                            not unquote(words[i + 2]).startswith('-'):
+                        found = (i, unquote(words[i + 2]))
+                        i += 2
+                    else:
+                        # Given without a value.
+                        found = (i, None)
+                elif option in BOOLEAN_OPTIONS and match.group(3) is None:
+                    found = (i, False if match.group(1) else None)
+            i += 2
+        return found
+
+    def get(self, option):
+        """Return the value of option: an integer for value options, or
+        None if it is not given or not a number; True or False for boolean
+        options, or None if they are not given."""
+        index, value = self._find(option)
+        if index is None:
+            return None
+        if option in VALUE_OPTIONS:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+        return value is None
+
+    def set(self, option, value):
+        """Set option to value, changing the last occurrence in its own
+        form, or appending it if it is not given."""
+        if self.get(option) == value:
+            return
+        index, current = self._find(option)
+        if option in VALUE_OPTIONS:
+            value = "%d" % value
+            if index is None:
+                self._append("--%s=%s" % (option, value))
+            elif current is None or '=' in self.parts[index]:
+                self.parts[index] = "--%s=%s" % (option, value)
+            else:
+                self.parts[index + 2] = value
+        else:
+            word = "--%s%s" % ('' if value else 'no-', option)
+            if index is None:
+                self._append(word)
+            else:
+                self.parts[index] = word
+
+    def _append(self, word):
+        """Add word at the end of the command line."""
+        if len(self.parts) > 1 and not self.parts[-1]:
+            self.parts[-1] = ' '
+        self.parts.extend([word, ''])
+
+
+def parse(text):
+    """Return the ExecLine for text."""
+    return ExecLine(text)
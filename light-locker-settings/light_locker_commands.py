@@ -0,0 +1,318 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Every external command goes through run(), which records the command,
+its duration and exit status, and the high-level operation (startup, Apply,
+probe) it ran for. A summary is printed to stderr when an operation ends
+with --profile-startup enabled, and every record is appended to the
+JSON-lines file named by --trace or LIGHT_LOCKER_SETTINGS_TRACE.
+
+An operation can also bound the time its commands may take and be
+cancelled from another thread, which kills the command running for it and
+cancels the cancellables registered with cancelled_with(). '''
+
+import os
+import sys
+import threading
+import time
+
+import light_locker_profile
+
+# Seconds to wait for a command before it is killed.
+DEFAULT_TIMEOUT = 10
+
+trace_file = os.environ.get('LIGHT_LOCKER_SETTINGS_TRACE')
+
+_local = threading.local()
+_trace_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    """Raised when the operation a command runs for was cancelled."""
+    pass
+
+
+class CommandTimeout(Exception):
+    """Raised when a command did not finish within its timeout."""
+    def __init__(self, args, timeout):
+        Exception.__init__(self, "%s timed out after %s seconds" %
+                           (" ".join(args), timeout))
+        self.args_list = args
+        self.timeout = timeout
+
+
+def set_trace_file(filename):
+    """Append a JSON line for every command to filename."""
+    global trace_file
+    trace_file = filename
+
+
+def _write_trace(record):
+    """Append record to the trace file, if one is configured."""
+    if not trace_file:
+        return
+    import json
+    with _trace_lock:
+        with open(trace_file, 'a') as trace:
+            trace.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def current_operation():
+    """Return the operation the current thread is running commands for."""
+    stack = getattr(_local, 'operations', None)
+    if stack:
+        return stack[-1]
+    return None
+
+
+def _operations():
+    """Return the operations the current thread is running, outermost
+    first."""
+    return getattr(_local, 'operations', None) or []
+
+
+class inherit:
+    """Context manager running the operations of another thread, as
+    returned by running_operations(), in the current one: their commands
+    are recorded with them and obey their deadlines and cancellation."""
+    def __init__(self, operations):
+        self.operations = list(operations)
+
+    def __enter__(self):
+        if getattr(_local, 'operations', None) is None:
+            _local.operations = []
+        _local.operations.extend(self.operations)
+        return self
+
+    def __exit__(self, *args):
+        if self.operations:
+            del _local.operations[-len(self.operations):]
+
+
+def running_operations():
+    """Return the operations the current thread is running, to be passed
+    to inherit() in a worker thread."""
+    return list(_operations())
+
+
+def time_left(default):
+    """Return the seconds left until the nearest deadline of the running
+    operations, or default if it is further away or there is none."""
+    now = time.time()
+    left = default
+    for op in _operations():
+        if op.deadline is not None:
+            left = min(left, op.deadline - now)
+    return left
+
+
+def check_cancelled():
+    """Raise Cancelled if one of the running operations was cancelled."""
+    for op in _operations():
+        if op.cancelled.is_set():
+            raise Cancelled(op.name)
+
+
+class cancelled_with:
+    """Context manager tying cancellable, e.g. a Gio.Cancellable, to the
+    operations the current thread is running: its cancel() method is
+    called when one of them is cancelled."""
+    def __init__(self, cancellable):
+        self.cancellable = cancellable
+        self.operations = []
+
+    def __enter__(self):
+        self.operations = _operations()
+        for op in self.operations:
+            with op.lock:
+                op.cancellables.add(self.cancellable)
+            # Cancelled before it was registered.
+            if op.cancelled.is_set():
+                self.cancellable.cancel()
+        return self.cancellable
+
+    def __exit__(self, *args):
+        for op in self.operations:
+            with op.lock:
+                op.cancellables.discard(self.cancellable)
+
+
+class operation:
+    """Context manager naming the operation the commands run by the current
+    thread belong to. Its commands together may take at most timeout
+    seconds, cancel() may be called from any thread."""
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = None
+        self.records = []
+        self.start = None
+        self.cancelled = threading.Event()
+        self.processes = set()
+        self.cancellables = set()
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        """Cancel the operation, killing the command it is running and
+        cancelling its D-Bus calls."""
+        self.cancelled.set()
+        with self.lock:
+            processes = list(self.processes)
+            cancellables = list(self.cancellables)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+        for cancellable in cancellables:
+            cancellable.cancel()
+
+    def __enter__(self):
+        if getattr(_local, 'operations', None) is None:
+            _local.operations = []
+        _local.operations.append(self)
+        self.start = time.time()
+        if self.timeout is not None:
+            self.deadline = self.start + self.timeout
+        return self
+
+    def __exit__(self, *args):
+        _local.operations.pop()
+        self.summarize()
+
+    def summarize(self):
+        """Report the commands run during this operation."""
+        if not self.records:
+            return
+        total = sum(record['duration_ms'] for record in self.records)
+        slowest = max(self.records, key=lambda record: record['duration_ms'])
+        failed = [record for record in self.records
+                  if record['status'] not in (0, None)]
+        summary = {
+            'type': 'summary',
+            'operation': self.name,
+            'commands': len(self.records),
+            'failed': len(failed),
+            'command_ms': round(total, 3),
+            'wall_ms': round((time.time() - self.start) * 1000, 3),
+            'slowest': " ".join(slowest['command'])
+        }
+        _write_trace(summary)
+        if light_locker_profile.enabled:
+            sys.stderr.write(
+                "commands: %-16s %d run, %d failed, %.1f ms, slowest: %s\n" %
+                (self.name, summary['commands'], summary['failed'],
+                 total, summary['slowest']))
+
+
+def _record(args, start, status, timed_out=False):
+    """Record one finished or spawned command with all running
+    operations."""
+    op = current_operation()
+    record = {
+        'type': 'command',
+        'command': list(args),
+        'operation': op.name if op is not None else None,
+        'start': round(start, 6),
+        'duration_ms': round((time.time() - start) * 1000, 3),
+        'status': status,
+        'timed_out': timed_out
+    }
+    for running in _operations():
+        running.records.append(record)
+    _write_trace(record)
+
+
+def run(args, output=False, check=False, timeout=None, stderr=None):
+    """Run the command args (a list) and wait for it.
+
+    Returns the output as text if output is True, else the exit status.
+    Raises subprocess.CalledProcessError for a non-zero exit status if
+    output or check is True, and CommandTimeout if the command had to be
+    killed after timeout seconds, by default DEFAULT_TIMEOUT or the time
+    left for the running operations. Raises Cancelled if they were
+    cancelled. stderr is passed on to subprocess.Popen."""
+    import subprocess
+
+    check_cancelled()
+    if timeout is None:
+        timeout = time_left(DEFAULT_TIMEOUT)
+    if timeout <= 0:
+        raise CommandTimeout(args, 0)
+
+    start = time.time()
+    try:
+        process = subprocess.Popen(args, stdout=subprocess.PIPE
+                                   if output else None, stderr=stderr)
+    except OSError:
+        _record(args, start, 127)
+        raise
+
+    operations = _operations()
+    for op in operations:
+        with op.lock:
+            op.processes.add(process)
+        # Cancelled while the command was being started.
+        if op.cancelled.is_set():
+            process.kill()
+
+    killed = []
+
+    def kill():
+        killed.append(True)
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        stdout = process.communicate()[0]
+    finally:
+        timer.cancel()
+        for op in operations:
+            with op.lock:
+                op.processes.discard(process)
+
+    _record(args, start, process.returncode, bool(killed))
+    check_cancelled()
+    if killed:
+        raise CommandTimeout(args, timeout)
+    if process.returncode != 0 and (output or check):
+        raise subprocess.CalledProcessError(process.returncode, args)
+
+    if output:
+        if not isinstance(stdout, str):
+            stdout = stdout.decode('utf-8')
+        return stdout
+    return process.returncode
+
+
+def spawn(args):
+    """Start the command args in the background without waiting for it,
+    return the subprocess.Popen object."""
+    import subprocess
+
+    start = time.time()
+    try:
+        process = subprocess.Popen(args)
+    except OSError:
+        _record(args, start, 127)
+        raise
+    _record(args, start, None)
+    return process
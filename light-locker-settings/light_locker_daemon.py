@@ -0,0 +1,442 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Per-session settings daemon, started with --daemon.
+
+The daemon probes the backends once and serves the settings from memory on
+the session bus. When the autostart files, the light-locker GSettings or
+the xfce4-power-manager channel change, only the settings held by that
+source are read again, and a Changed signal carries the values that moved.
+Writes and those reads run on a worker thread. Settings use the names and
+units of the command line (see light_locker_cli.SETTINGS).
+
+    Get(s key) -> (v value)
+    GetAll() -> (a{sv} settings)
+    Set(s key, v value) -> ()
+    Apply(a{sv} settings) -> (as changed)
+    signal Changed(a{sv} settings)
+
+The daemon uses the bus named by $DBUS_SESSION_BUS_ADDRESS, so it can be
+run on a private bus with dbus-run-session. '''
+
+import sys
+import threading
+
+from gi.repository import GLib, Gio
+
+import light_locker_cli
+import light_locker_commands
+import light_locker_xfsync
+from light_locker_backend import LOCK_SETTINGS, SCREEN_BLANK_SETTINGS, \
+    LightLockerBackend, WriteError, watch_autostart
+
+BUS_NAME = 'org.antergos.LightLockerSettings'
+OBJECT_PATH = '/org/antergos/LightLockerSettings'
+INTERFACE = 'org.antergos.LightLockerSettings'
+
+ERROR_UNKNOWN_KEY = INTERFACE + '.Error.UnknownKey'
+ERROR_INVALID_VALUE = INTERFACE + '.Error.InvalidValue'
+ERROR_FAILED = INTERFACE + '.Error.Failed'
+
+INTROSPECTION_XML = '''
+<node>
+  <interface name="org.antergos.LightLockerSettings">
+    <method name="Get">
+      <arg type="s" name="key" direction="in"/>
+      <arg type="v" name="value" direction="out"/>
+    </method>
+    <method name="GetAll">
+      <arg type="a{sv}" name="settings" direction="out"/>
+    </method>
+    <method name="Set">
+      <arg type="s" name="key" direction="in"/>
+      <arg type="v" name="value" direction="in"/>
+    </method>
+    <method name="Apply">
+      <arg type="a{sv}" name="settings" direction="in"/>
+      <arg type="as" name="changed" direction="out"/>
+    </method>
+    <signal name="Changed">
+      <arg type="a{sv}" name="settings"/>
+    </signal>
+  </interface>
+</node>
+'''
+
+# Milliseconds to collect change notifications before reading the
+# settings again, one Apply touches several sources.
+REFRESH_DELAY = 200
+
+# Milliseconds the client waits for the daemon.
+CALL_TIMEOUT = 30000
+
+# The settings read again when one of their sources changes.
+SOURCE_SETTINGS = {
+    'light-locker.desktop': LOCK_SETTINGS,
+    'gsettings': LOCK_SETTINGS,
+    'screensaver-settings.desktop': SCREEN_BLANK_SETTINGS,
+    'xfce4-power-manager': ('lock-on-suspend',)
+}
+
+XFPM_LOCK_ON_SUSPEND = '/xfce4-power-manager/lock-screen-suspend-hibernate'
+
+
+def to_variant(key, value):
+    """Return the GLib.Variant for the value of setting key."""
+    if key == 'screensaver-manager':
+        return GLib.Variant('as', list(value))
+    if isinstance(value, bool):
+        return GLib.Variant('b', value)
+    return GLib.Variant('u', value)
+
+
+def check_changes(changes):
+    """Raise KeyError for unknown settings and ValueError for values of the
+    wrong type in the dictionary changes."""
+    for key, value in changes.items():
+        p_type = light_locker_cli.setting_types.get(key)
+        if p_type is None:
+            raise KeyError(key)
+        if p_type is bool:
+            valid = isinstance(value, bool)
+        else:
+            valid = isinstance(value, int) and not isinstance(value, bool) \
+                and value >= 0
+        if not valid:
+            raise ValueError("Invalid value for %s: %r" % (key, value))
+
+
+def run_in_thread(function, callback):
+    """Run function on a worker thread and callback(result, error) on the
+    main loop once it returns."""
+    def worker():
+        result = error = None
+        try:
+            result = function()
+        except Exception as e:
+            error = e
+
+        def done_cb():
+            callback(result, error)
+            return False
+        GLib.idle_add(done_cb)
+
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    thread.start()
+
+
+class Daemon:
+    """Serve the settings of backend on connection.
+
+    Reads are answered from memory on the main loop. Writes and the reads
+    following a change of a source run on a worker thread, one at a time,
+    so a slow backend never delays Get or GetAll."""
+
+    def __init__(self, connection, backend=None):
+        self.connection = connection
+        self.backend = backend if backend is not None else LightLockerBackend()
+        self.settings = dict()
+        self.refresh_source = None
+        self.pending_sources = set()
+        self.pending_applies = []
+        self.busy = False
+
+        with light_locker_commands.operation('probe'):
+            self.settings = self.backend.get_settings()
+
+        node_info = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION_XML)
+        self.registration = connection.register_object(
+            OBJECT_PATH, node_info.interfaces[0], self.method_call_cb,
+            None, None)
+
+        # Watch every source of the cached settings. Writes of the daemon
+        # itself are filtered out by watch_autostart(), and by comparing
+        # the values for the others.
+        watch_autostart('light-locker.desktop', self.source_changed_cb)
+        watch_autostart('screensaver-settings.desktop',
+                        self.source_changed_cb)
+        if self.backend.gsettings_available():
+            self.backend.gsettings.connect('changed',
+                                           self.gsettings_changed_cb)
+        xfconf_connection = light_locker_xfsync.xfconf_get_connection()
+        if xfconf_connection is not None:
+            xfconf_connection.signal_subscribe(
+                light_locker_xfsync.XFCONF_BUS_NAME,
+                light_locker_xfsync.XFCONF_INTERFACE, None,
+                light_locker_xfsync.XFCONF_OBJECT_PATH,
+                'xfce4-power-manager', Gio.DBusSignalFlags.NONE,
+                self.xfconf_changed_cb)
+
+    def get_all(self):
+        """Return the cached settings and, if one is running, the
+        screensaver manager as [name, command]."""
+        settings = dict(self.settings)
+        if self.backend.screensaver_manager is not None:
+            settings['screensaver-manager'] = self.backend.screensaver_manager
+        return settings
+
+    def gsettings_changed_cb(self, settings, key):
+        """Read the lock settings again unless key holds the cached value,
+        as after a write of the daemon."""
+        if key in LOCK_SETTINGS and \
+                self.settings.get(key) != settings.get_value(key).unpack():
+            self.source_changed_cb('gsettings')
+
+    def xfconf_changed_cb(self, connection, sender_name, object_path,
+                          interface_name, signal_name, parameters):
+        """Read lock-on-suspend again when xfce4-power-manager's copy of it
+        changes to another value than the cached one."""
+        values = parameters.unpack()
+        if values[1] != XFPM_LOCK_ON_SUSPEND:
+            return
+        if signal_name == 'PropertyChanged' and \
+                values[2] == self.settings.get('lock-on-suspend'):
+            return
+        self.source_changed_cb('xfce4-power-manager')
+
+    def source_changed_cb(self, source):
+        """Read the settings of source again shortly after it changed."""
+        self.pending_sources.add(source)
+        if self.refresh_source is None:
+            self.refresh_source = GLib.timeout_add(REFRESH_DELAY,
+                                                   self.refresh_cb)
+
+    def refresh_cb(self):
+        self.refresh_source = None
+        self.run_next()
+        return False
+
+    def run_next(self):
+        """Start the next queued Apply, or else the pending refresh, unless
+        one of them is running."""
+        if self.busy:
+            return
+        if self.pending_applies:
+            changes, invocation = self.pending_applies.pop(0)
+            self.start_apply(changes, invocation)
+        elif self.pending_sources and self.refresh_source is None:
+            sources = self.pending_sources
+            self.pending_sources = set()
+            self.start_refresh(sources)
+
+    def start_refresh(self, sources):
+        """Read the settings held by sources on a worker thread."""
+        keys = set()
+        for source in sources:
+            keys.update(SOURCE_SETTINGS[source])
+        # Drop the parsed autostart files, they are read again.
+        if 'light-locker.desktop' in sources:
+            self.backend.light_locker_keyfile = None
+        if 'screensaver-settings.desktop' in sources:
+            self.backend.screensaver_keyfile = None
+
+        def refresh():
+            with light_locker_commands.operation('probe'):
+                return self.backend.get_settings(keys)
+
+        self.busy = True
+        run_in_thread(refresh, self.refresh_done_cb)
+
+    def refresh_done_cb(self, settings, error):
+        self.busy = False
+        if error is None:
+            changes = dict((key, value) for key, value in settings.items()
+                           if self.settings.get(key) != value)
+            self.settings.update(settings)
+            if changes:
+                self.emit_changed(changes)
+        else:
+            sys.stderr.write("Reading the settings failed: %s\n" % error)
+        self.run_next()
+
+    def emit_changed(self, changes):
+        """Emit the Changed signal for the dictionary changes."""
+        values = dict((key, to_variant(key, value))
+                      for key, value in changes.items())
+        self.connection.emit_signal(None, OBJECT_PATH, INTERFACE, 'Changed',
+                                    GLib.Variant('(a{sv})', (values,)))
+
+    def apply(self, changes, invocation):
+        """Write the dictionary changes and answer invocation with the
+        changed keys once they are written. Raises KeyError and ValueError
+        for invalid changes."""
+        check_changes(changes)
+        self.pending_applies.append((changes, invocation))
+        self.run_next()
+
+    def start_apply(self, changes, invocation):
+        """Write changes on a worker thread."""
+        settings, changed = light_locker_cli.update_settings(self.settings,
+                                                             changes)
+        if not changed:
+            self.return_apply(invocation, [])
+            self.run_next()
+            return
+
+        def write():
+            with light_locker_commands.operation('apply'):
+                self.backend.write_settings(settings, changed)
+
+        def done_cb(result, error):
+            self.busy = False
+            if error is None:
+                self.settings = settings
+                self.emit_changed(dict((key, settings[key])
+                                       for key in changed))
+                self.return_apply(invocation, sorted(changed))
+            else:
+                if isinstance(error, WriteError):
+                    # Some backends were written, serve what they hold now.
+                    for source in SOURCE_SETTINGS:
+                        self.pending_sources.add(source)
+                invocation.return_dbus_error(ERROR_FAILED, str(error))
+            self.run_next()
+
+        self.busy = True
+        run_in_thread(write, done_cb)
+
+    @staticmethod
+    def return_apply(invocation, changed):
+        """Answer a Set or Apply call."""
+        if invocation.get_method_name() == 'Set':
+            invocation.return_value(None)
+        else:
+            invocation.return_value(GLib.Variant('(as)', (changed,)))
+
+    def method_call_cb(self, connection, sender, object_path, interface_name,
+                       method_name, parameters, invocation):
+        """Dispatch a method call of the settings interface."""
+        args = parameters.unpack()
+        try:
+            if method_name == 'Get':
+                settings = self.get_all()
+                if args[0] not in settings:
+                    raise KeyError(args[0])
+                value = to_variant(args[0], settings[args[0]])
+                invocation.return_value(GLib.Variant('(v)', (value,)))
+            elif method_name == 'GetAll':
+                values = dict((key, to_variant(key, value))
+                              for key, value in self.get_all().items())
+                invocation.return_value(GLib.Variant('(a{sv})', (values,)))
+            elif method_name == 'Set':
+                self.apply({args[0]: args[1]}, invocation)
+            elif method_name == 'Apply':
+                self.apply(args[0], invocation)
+        except KeyError as error:
+            invocation.return_dbus_error(ERROR_UNKNOWN_KEY,
+                                         "Unknown setting: %s" % error.args[0])
+        except ValueError as error:
+            invocation.return_dbus_error(ERROR_INVALID_VALUE, str(error))
+        except Exception as error:
+            invocation.return_dbus_error(ERROR_FAILED, str(error))
+
+
+class Client:
+    """Talk to a running daemon."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @classmethod
+    def connect(cls):
+        """Return a Client if a daemon is running on the session bus, else
+        None."""
+        try:
+            connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+            reply = connection.call_sync(
+                'org.freedesktop.DBus', '/org/freedesktop/DBus',
+                'org.freedesktop.DBus', 'NameHasOwner',
+                GLib.Variant('(s)', (BUS_NAME,)), GLib.VariantType.new('(b)'),
+                Gio.DBusCallFlags.NONE, 1000, None)
+        except GLib.Error:
+            return None
+        if not reply.unpack()[0]:
+            return None
+        return cls(connection)
+
+    def _call(self, method, parameters, reply_type, cancellable=None):
+        reply = self.connection.call_sync(
+            BUS_NAME, OBJECT_PATH, INTERFACE, method, parameters,
+            GLib.VariantType.new(reply_type), Gio.DBusCallFlags.NONE,
+            CALL_TIMEOUT, cancellable)
+        return reply.unpack()
+
+    def get(self, key):
+        """Return the value of setting key."""
+        return self._call('Get', GLib.Variant('(s)', (key,)), '(v)')[0]
+
+    def get_all(self):
+        """Return a dictionary of all settings."""
+        return self._call('GetAll', None, '(a{sv})')[0]
+
+    def set(self, key, value):
+        """Change the value of setting key."""
+        self._call('Set', GLib.Variant('(sv)', (key, to_variant(key, value))),
+                   '()')
+
+    def apply(self, changes, cancellable=None):
+        """Write the dictionary changes, return the changed keys. The call
+        can be abandoned with the Gio.Cancellable cancellable."""
+        values = dict((key, to_variant(key, value))
+                      for key, value in changes.items())
+        return self._call('Apply', GLib.Variant('(a{sv})', (values,)),
+                          '(as)', cancellable)[0]
+
+    def subscribe(self, callback):
+        """Call callback(changes) on the main loop for every Changed
+        signal, return the subscription id."""
+        def signal_cb(connection, sender, object_path, interface_name,
+                      signal_name, parameters):
+            callback(parameters.unpack()[0])
+        return self.connection.signal_subscribe(
+            BUS_NAME, INTERFACE, 'Changed', OBJECT_PATH, None,
+            Gio.DBusSignalFlags.NONE, signal_cb)
+
+
+def run(backend=None):
+    """Run the daemon for backend, by default a LightLockerBackend, until
+    its bus name is lost, return the exit status."""
+    try:
+        connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    except GLib.Error as error:
+        sys.stderr.write("%s\n" % error.message)
+        return 1
+
+    loop = GLib.MainLoop()
+    daemon = Daemon(connection, backend)
+    status = []
+
+    def name_acquired_cb(connection, name):
+        status.append(0)
+
+    def name_lost_cb(connection, name):
+        # Either another daemon already runs, or the bus went away.
+        if not status:
+            sys.stderr.write("%s is already running\n" % BUS_NAME)
+            status.append(1)
+        loop.quit()
+
+    owner_id = Gio.bus_own_name_on_connection(
+        connection, BUS_NAME, Gio.BusNameOwnerFlags.NONE,
+        name_acquired_cb, name_lost_cb)
+    try:
+        loop.run()
+    finally:
+        Gio.bus_unown_name(owner_id)
+        connection.unregister_object(daemon.registration)
+    return status[0] if status else 0
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Startup phase timing, enabled with --profile-startup or by setting
+LIGHT_LOCKER_SETTINGS_PROFILE in the environment. Each phase is printed to
+stderr as it finishes. '''
+
+import functools
+import os
+import sys
+import threading
+import time
+
+# Reference point for all timings, this module is imported first.
+start_time = time.time()
+
+enabled = bool(os.environ.get('LIGHT_LOCKER_SETTINGS_PROFILE'))
+
+_output_lock = threading.Lock()
+
+
+def enable():
+    """Start printing phase timings."""
+    global enabled
+    enabled = True
+
+
+def record(name, start, end=None):
+    """Print the duration of phase name, which ran from start to end."""
+    if not enabled:
+        return
+    if end is None:
+        end = time.time()
+    with _output_lock:
+        sys.stderr.write("profile: %-16s %8.1f ms  (done at %8.1f ms)\n" %
+                         (name, (end - start) * 1000,
+                          (end - start_time) * 1000))
+
+
+class phase:
+    """Context manager timing the enclosed block as phase name."""
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        record(self.name, self.start)
+
+
+def timed(name):
+    """Decorator timing every call of the decorated function as phase
+    name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,288 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Bulk provisioning, writes a lock policy into many home directories
+without a session of their users.
+
+For every home directory the light-locker and screensaver autostart files
+are written, keeping the other content of existing files. Files that
+already hold the policy are left alone. The policy is carried by the
+light-locker command line only: the per-user GSettings live in the binary
+dconf database of each user, which cannot be written without a session.
+
+When run as root, every home is provisioned by a child process running as
+the owner of the home directory, so symbolic links planted by the owner
+can never make root write or chown files elsewhere. '''
+
+import json
+import os
+import sys
+
+from gi.repository import GLib
+
+from light_locker_backend import LOCK_SETTINGS, SCREEN_BLANK_SETTINGS, \
+    get_light_locker_exec, get_screensaver_exec, \
+    light_locker_autostart_defaults, screensaver_autostart_defaults
+
+AUTOSTART_DIR = os.path.join('.config', 'autostart')
+
+# Homes provisioned at the same time.
+DEFAULT_JOBS = 8
+
+
+class ProvisionError(Exception):
+    """Raised when a home directory cannot be provisioned safely."""
+    pass
+
+
+def check_policy(policy):
+    """Raise ValueError unless policy names either all or none of the lock
+    settings and of the screen blank settings, and at least one group."""
+    groups = 0
+    for group in (LOCK_SETTINGS, SCREEN_BLANK_SETTINGS):
+        given = [key for key in group if key in policy]
+        if given and len(given) != len(group):
+            missing = [key for key in group if key not in policy]
+            raise ValueError("Missing settings: %s" % ", ".join(missing))
+        if given:
+            groups += 1
+    if not groups:
+        raise ValueError("No settings given")
+
+
+def get_files(policy):
+    """Return the files written for policy as a list of (relative path,
+    group, {key: value}, defaults) tuples."""
+    files = []
+    if 'lock-enabled' in policy:
+        # Late locking requires locking with the screensaver.
+        if policy['lock-after-screensaver'] == 0:
+            policy = dict(policy, **{'late-locking': False})
+        files.append((os.path.join(AUTOSTART_DIR, 'light-locker.desktop'),
+                      'Desktop Entry',
+                      {'Exec': get_light_locker_exec(policy)},
+                      light_locker_autostart_defaults()))
+    if 'screen-blank-timeout' in policy:
+        files.append((os.path.join(AUTOSTART_DIR,
+                                   'screensaver-settings.desktop'),
+                      'Desktop Entry',
+                      {'Exec': get_screensaver_exec(policy)},
+                      screensaver_autostart_defaults()))
+    return files
+
+
+def check_path(home, path):
+    """Raise ProvisionError if path does not resolve to a place inside home,
+    e.g. because a directory on the way is a symbolic link."""
+    real_home = os.path.realpath(home)
+    real_path = os.path.realpath(path)
+    if not real_path.startswith(real_home + os.sep) or \
+            os.path.islink(path):
+        raise ProvisionError("%s leaves the home directory" % path)
+
+
+def make_dirs(home, directory):
+    """Create directory below home."""
+    missing = []
+    while not os.path.isdir(directory):
+        missing.append(directory)
+        directory = os.path.dirname(directory)
+    for directory in reversed(missing):
+        check_path(home, directory)
+        os.mkdir(directory, 0o755)
+
+
+def update_file(home, relative_path, group, values, defaults):
+    """Merge values into group of the key file relative_path below home,
+    return True if it had to be written."""
+    path = os.path.join(home, relative_path)
+    check_path(home, path)
+
+    keyfile = GLib.KeyFile.new()
+    current = None
+    try:
+        with open(path, 'rb') as f:
+            current = f.read()
+        keyfile.load_from_data(current.decode('utf-8'), len(current),
+                               GLib.KeyFileFlags.KEEP_COMMENTS |
+                               GLib.KeyFileFlags.KEEP_TRANSLATIONS)
+    except (IOError, OSError):
+        pass
+    except (GLib.Error, UnicodeDecodeError):
+        # Replace files that cannot be parsed.
+        keyfile = GLib.KeyFile.new()
+
+    present = keyfile.get_keys(group)[0] if keyfile.has_group(group) \
+        else []
+    for key, value in defaults.items():
+        if key not in present:
+            keyfile.set_value(group, key, value)
+    for key, value in values.items():
+        keyfile.set_value(group, key, value)
+
+    data = keyfile.to_data()[0]
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    if data == current:
+        return False
+
+    make_dirs(home, os.path.dirname(path))
+    check_path(home, path)
+    GLib.file_set_contents(path, data)
+    return True
+
+
+def provision_home(home, files):
+    """Write files, as returned by get_files(), into home with the
+    privileges of the current process. Return a (home, status, message)
+    tuple with status one of "changed", "unchanged" or "failed"."""
+    try:
+        if not os.path.isdir(home):
+            raise ProvisionError("not a directory")
+        written = []
+        for relative_path, group, values, defaults in files:
+            if update_file(home, relative_path, group, values, defaults):
+                written.append(relative_path)
+    except (ProvisionError, EnvironmentError, GLib.Error) as error:
+        return home, 'failed', str(error)
+
+    if written:
+        return home, 'changed', ", ".join(written)
+    return home, 'unchanged', ''
+
+
+def start_as_owner(home, files):
+    """Fork a child provisioning home as the owner of the directory,
+    return (pid, fd): the child writes its result to the pipe fd as JSON."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(write_fd)
+        return pid, read_fd
+
+    # The child never returns.
+    status = 1
+    try:
+        os.close(read_fd)
+        try:
+            stat = os.stat(home)
+            os.setgroups([])
+            os.setgid(stat.st_gid)
+            os.setuid(stat.st_uid)
+            result = provision_home(home, files)
+        except Exception as error:
+            result = (home, 'failed', str(error))
+        os.write(write_fd, json.dumps(result).encode('utf-8'))
+        status = 0
+    finally:
+        os._exit(status)
+
+
+def read_result(home, fd):
+    """Return the result written to fd by a child started by
+    start_as_owner() that has exited."""
+    chunks = []
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(fd)
+    try:
+        return tuple(json.loads(b''.join(chunks).decode('utf-8')))
+    except ValueError:
+        return home, 'failed', "provisioning process died"
+
+
+def provision_as_owners(homes, files, jobs):
+    """Provision homes with up to jobs child processes, each running as
+    the owner of its home, yield the results as they finish."""
+    homes = iter(homes)
+    running = dict()
+    while True:
+        while len(running) < jobs:
+            home = next(homes, None)
+            if home is None:
+                break
+            pid, fd = start_as_owner(home, files)
+            running[pid] = (home, fd)
+        if not running:
+            return
+        pid = os.wait()[0]
+        if pid not in running:
+            continue
+        home, fd = running.pop(pid)
+        yield read_result(home, fd)
+
+
+def provision(homes, policy, jobs=DEFAULT_JOBS):
+    """Provision every home directory in homes with policy, jobs at a
+    time, yield a (home, status, message) tuple for each as it finishes.
+
+    As root, every home is provisioned by a forked child running as its
+    owner; the process must not have other threads then. Otherwise the
+    homes are written by a pool of threads."""
+    check_policy(policy)
+    files = get_files(policy)
+    jobs = max(1, jobs)
+    if os.getuid() == 0:
+        for result in provision_as_owners(homes, files, jobs):
+            yield result
+        return
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(jobs)
+    try:
+        for result in pool.imap_unordered(
+                lambda home: provision_home(home, files), homes):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def read_homes(filename):
+    """Return the home directories listed one per line in filename, or on
+    the standard input if it is "-"."""
+    if filename == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(filename) as f:
+            lines = f.readlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def run(homes_file, policy, jobs=DEFAULT_JOBS):
+    """Provision the homes listed in homes_file and print one line per home,
+    return the exit status: 1 if any home failed."""
+    try:
+        homes = read_homes(homes_file)
+        check_policy(policy)
+    except (IOError, ValueError) as error:
+        sys.stderr.write("%s\n" % error)
+        return 2
+
+    failed = 0
+    for home, status, message in provision(homes, policy, jobs):
+        if status == 'failed':
+            failed += 1
+        if message:
+            sys.stdout.write("%s: %s: %s\n" % (home, status, message))
+        else:
+            sys.stdout.write("%s: %s\n" % (home, status))
+        sys.stdout.flush()
+    return 1 if failed else 0
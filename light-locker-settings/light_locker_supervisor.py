@@ -0,0 +1,236 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Restart light-locker on the legacy (pre-GSettings) path.
+
+The running instance is found through the pidfile written when it was
+started from here, or through the owner of the screensaver D-Bus name
+light-locker holds, without walking the process table. Stopping waits for
+the old instance to exit, escalating to SIGKILL, and starting waits until
+the new instance holds the bus name, so the two never overlap. '''
+
+import os
+import signal
+import time
+
+import light_locker_commands
+
+try:
+    from gi.repository import Gio, GLib
+except ImportError:
+    Gio = None
+
+# light-locker implements the freedesktop screensaver interface and exits
+# if another program owns the name.
+LIGHT_LOCKER_BUS_NAME = 'org.freedesktop.ScreenSaver'
+
+# Seconds to wait for light-locker to exit after SIGTERM, and after SIGKILL,
+# at most. The waits end earlier when the running operation runs out of time.
+STOP_TIMEOUT = 3.0
+KILL_TIMEOUT = 1.0
+# Seconds to wait for a new instance to claim its bus name, at most.
+START_TIMEOUT = 3.0
+# Seconds a new instance has to stay up to count as started when there is
+# no session bus to confirm it on.
+START_GRACE = 0.2
+POLL_INTERVAL = 0.02
+
+
+class SupervisorError(Exception):
+    """Raised when light-locker could not be stopped or started."""
+    pass
+
+
+def get_pidfile():
+    """Return the path of the pidfile, in $XDG_RUNTIME_DIR."""
+    return os.path.join(GLib.get_user_runtime_dir(), 'light-locker-settings',
+                        'light-locker.pid')
+
+
+def read_pidfile():
+    """Return the PID stored in the pidfile, or None."""
+    try:
+        with open(get_pidfile()) as pidfile:
+            return int(pidfile.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_pidfile(pid):
+    """Store pid in the pidfile, or remove the pidfile if pid is None."""
+    path = get_pidfile()
+    if pid is None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+    GLib.file_set_contents(path, ("%d\n" % pid).encode('utf-8'))
+
+
+def is_light_locker(pid):
+    """Return True if pid is a running light-locker process of this user."""
+    try:
+        if os.stat('/proc/%d' % pid).st_uid != os.getuid():
+            return False
+        with open('/proc/%d/comm' % pid) as comm:
+            return comm.read().strip() == 'light-locker'
+    except (IOError, OSError):
+        return False
+
+
+def is_running(pid):
+    """Return True if pid exists and is not a zombie. Children of this
+    process are reaped on the way."""
+    try:
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except OSError:
+        # Not our child.
+        pass
+    try:
+        with open('/proc/%d/stat' % pid) as stat:
+            return stat.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (IOError, OSError, IndexError):
+        pass
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def get_connection():
+    """Return the session bus connection, or None."""
+    if Gio is None:
+        return None
+    try:
+        return Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    except GLib.Error:
+        return None
+
+
+def get_bus_owner_pid(connection):
+    """Return the PID of the owner of the light-locker bus name, or None if
+    the name has no owner."""
+    try:
+        reply = connection.call_sync(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus',
+            'org.freedesktop.DBus', 'GetConnectionUnixProcessID',
+            GLib.Variant('(s)', (LIGHT_LOCKER_BUS_NAME,)),
+            GLib.VariantType.new('(u)'), Gio.DBusCallFlags.NONE, 1000, None)
+    except GLib.Error:
+        return None
+    return reply.unpack()[0]
+
+
+def find_light_locker():
+    """Return (pids, certain): the PIDs of the running light-locker
+    instances found cheaply, and whether the result can be trusted to be
+    complete. It cannot be without a session bus, or when another program
+    owns the bus name; callers should then fall back to a process scan."""
+    pids = []
+    pid = read_pidfile()
+    if pid is not None and is_light_locker(pid):
+        pids.append(pid)
+
+    connection = get_connection()
+    if connection is None:
+        return pids, False
+    pid = get_bus_owner_pid(connection)
+    if pid is not None and pid not in pids:
+        # Another screensaver holds the name, a light-locker instance
+        # without it can only be found by a process scan.
+        if not is_light_locker(pid):
+            return pids, False
+        pids.append(pid)
+    return pids, True
+
+
+def wait_for_exit(pid, timeout):
+    """Wait up to timeout seconds, or the time left for the running
+    operations, for pid to exit, return True if it did."""
+    deadline = time.time() + light_locker_commands.time_left(timeout)
+    while is_running(pid):
+        if time.time() >= deadline:
+            return False
+        light_locker_commands.check_cancelled()
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def stop(pids):
+    """Terminate the light-locker processes pids and wait until they have
+    exited. Raises SupervisorError if one survives SIGKILL."""
+    # PIDs from a pidfile or a process scan may be stale or reused.
+    pids = [pid for pid in pids if is_light_locker(pid)]
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    for pid in pids:
+        if wait_for_exit(pid, STOP_TIMEOUT):
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+        if not wait_for_exit(pid, KILL_TIMEOUT):
+            raise SupervisorError("light-locker (%d) did not exit" % pid)
+    if pids and read_pidfile() in pids:
+        write_pidfile(None)
+
+
+def start(args):
+    """Start light-locker with the argument list args and wait until it is
+    running, return its PID. Raises SupervisorError if it exits early or
+    another program holds its bus name."""
+    process = light_locker_commands.spawn(args)
+    write_pidfile(process.pid)
+
+    connection = get_connection()
+    timeout = START_TIMEOUT if connection is not None else START_GRACE
+    deadline = time.time() + light_locker_commands.time_left(timeout)
+    while time.time() < deadline:
+        if process.poll() is not None:
+            write_pidfile(None)
+            raise SupervisorError("light-locker exited with status %d" %
+                                  process.returncode)
+        if connection is not None and \
+                get_bus_owner_pid(connection) == process.pid:
+            return process.pid
+        light_locker_commands.check_cancelled()
+        time.sleep(POLL_INTERVAL)
+
+    # The name may have been taken by another screensaver in the meantime,
+    # light-locker cannot work next to it.
+    owner = get_bus_owner_pid(connection) if connection is not None \
+        else None
+    if owner is not None and owner != process.pid:
+        try:
+            process.kill()
+        except OSError:
+            pass
+        process.wait()
+        write_pidfile(None)
+        raise SupervisorError("%s is owned by another program (%d)" %
+                              (LIGHT_LOCKER_BUS_NAME, owner))
+    return process.pid
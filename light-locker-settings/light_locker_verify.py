@@ -0,0 +1,243 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Drift check, started with --verify.
+
+Every place a setting is stored is read once, without the precedence rules
+the settings window applies, and the values are compared. A JSON report is
+printed on the standard output, e.g.
+
+    {"drift": true, "elapsed-ms": 12.3, "settings": {
+        "lock-on-suspend": {"drift": true, "values": {
+            "gsettings": true, "xfce4-power-manager": false}}, ...},
+     "unavailable": {"x-server": "cannot open display"}}
+
+Sources that do not hold a setting, e.g. the light-locker.desktop command
+line when the options are stored in GSettings, are left out of its values.
+The exit status is 0 if all sources agree, 1 if any setting drifted and 2
+if none drifted but some sources could not be read, so they may still
+disagree.
+
+Gtk is not loaded, no command is run and the process table is not
+scanned: the X server is queried in-process and xfconf over D-Bus, for the
+Xfce programs the session runs only. '''
+
+import json
+import os
+import sys
+import time
+
+# Seconds the whole check may take, D-Bus calls give up when it is over.
+VERIFY_TIMEOUT = 2
+
+# The sources of each setting, in the form taken by
+# LightLockerBackend.write_settings().
+SOURCES = {
+    'lock-enabled': ('light-locker.desktop',),
+    'late-locking': ('gsettings', 'light-locker.desktop'),
+    'lock-after-screensaver': ('gsettings', 'light-locker.desktop'),
+    'lock-on-suspend': ('gsettings', 'light-locker.desktop', 'xfce4-session',
+                        'xfce4-power-manager'),
+    'screen-blank-timeout': ('x-server', 'screensaver-settings.desktop'),
+    'screen-off-timeout': ('x-server', 'screensaver-settings.desktop')
+}
+
+# xfconf (channel, property) of lock-on-suspend for each Xfce program.
+XFCONF_LOCK_ON_SUSPEND = {
+    'xfce4-session': ('xfce4-session', '/shutdown/LockScreen'),
+    'xfce4-power-manager': ('xfce4-power-manager',
+                            '/xfce4-power-manager/'
+                            'lock-screen-suspend-hibernate')
+}
+
+# D-Bus name each Xfce program owns while it runs.
+XFCE_BUS_NAMES = {
+    'xfce4-session': 'org.xfce.SessionManager',
+    'xfce4-power-manager': 'org.xfce.PowerManager'
+}
+
+
+def read_gsettings(backend):
+    """Return the light-locker settings stored in GSettings, empty if the
+    schema is not installed."""
+    backend.gsettings_init()
+    if not backend.gsettings_available():
+        return dict()
+    return {
+        'late-locking': backend.gsettings.get_boolean('late-locking'),
+        'lock-after-screensaver':
+            backend.gsettings.get_uint('lock-after-screensaver'),
+        'lock-on-suspend': backend.gsettings.get_boolean('lock-on-suspend')
+    }
+
+
+def read_light_locker_autostart(backend):
+    """Return the settings given on the light-locker command line in
+    light-locker.desktop."""
+    import light_locker_cmdline
+
+    keyfile = backend.get_light_locker_autostart()
+    ll_exec = light_locker_cmdline.parse(
+        keyfile.get_value("Desktop Entry", "Exec"))
+    settings = {'lock-enabled': backend.get_light_locker_enabled()}
+    for key in ('late-locking', 'lock-after-screensaver', 'lock-on-suspend'):
+        value = ll_exec.get(key)
+        if value is not None:
+            settings[key] = value
+    return settings
+
+
+def session_runs(program):
+    """Return True if the Xfce program runs in this session: the desktop is
+    Xfce or, without $XDG_CURRENT_DESKTOP, the program owns its bus name."""
+    import light_locker_commands
+    import light_locker_xfsync
+    from gi.repository import Gio, GLib
+
+    desktop = os.environ.get('XDG_CURRENT_DESKTOP')
+    if desktop:
+        return 'XFCE' in desktop.upper().split(':')
+
+    connection = light_locker_xfsync.xfconf_get_connection()
+    if connection is None:
+        return False
+    timeout = light_locker_commands.time_left(VERIFY_TIMEOUT)
+    reply = connection.call_sync(
+        'org.freedesktop.DBus', '/org/freedesktop/DBus',
+        'org.freedesktop.DBus', 'NameHasOwner',
+        GLib.Variant('(s)', (XFCE_BUS_NAMES[program],)),
+        GLib.VariantType.new('(b)'), Gio.DBusCallFlags.NONE,
+        max(1, int(timeout * 1000)), None)
+    return reply.unpack()[0]
+
+
+def read_xfconf(program):
+    """Return lock-on-suspend as stored by program in xfconf, empty if it is
+    not installed, not used by the session or has never stored it."""
+    import light_locker_capabilities
+    import light_locker_xfsync
+
+    # Reading xfconf would start xfconfd outside of Xfce sessions.
+    if not light_locker_capabilities.has_program(program) or \
+            not session_runs(program):
+        return dict()
+    channel, prop = XFCONF_LOCK_ON_SUSPEND[program]
+    value = light_locker_xfsync.xfconf_get_property(channel, prop,
+                                                    fallback=False)
+    if value is None:
+        return dict()
+    return {'lock-on-suspend': value}
+
+
+def read_x_server():
+    """Return the screen blank and off timeouts set in the X server."""
+    import light_locker_x11
+
+    blank, off = light_locker_x11.get_screen_timeouts()
+    return {'screen-blank-timeout': blank, 'screen-off-timeout': off}
+
+
+def read_screensaver_autostart(backend):
+    """Return the timeouts of the xset command in
+    screensaver-settings.desktop, empty if there is none."""
+    import light_locker_cmdline
+    from light_locker_backend import read_autostart
+
+    # Not created while another application manages the screensaver.
+    if read_autostart('screensaver-settings.desktop') is None:
+        return dict()
+    keyfile = backend.get_screensaver_autostart()
+    argv = light_locker_cmdline.parse(
+        keyfile.get_value("Desktop Entry", "Exec")).argv()
+    if not argv or argv[0] != 'xset':
+        return dict()
+
+    settings = dict()
+    for option, key in (('s', 'screen-blank-timeout'),
+                        ('dpms', 'screen-off-timeout')):
+        try:
+            settings[key] = int(argv[argv.index(option) + 1])
+        except (ValueError, IndexError):
+            pass
+    return settings
+
+
+def read_sources(backend):
+    """Read every source once, return a dictionary of their settings and a
+    dictionary of the sources that could not be read with the reason."""
+    readers = [
+        ('gsettings', lambda: read_gsettings(backend)),
+        ('light-locker.desktop', lambda: read_light_locker_autostart(backend)),
+        ('xfce4-session', lambda: read_xfconf('xfce4-session')),
+        ('xfce4-power-manager', lambda: read_xfconf('xfce4-power-manager')),
+        ('x-server', read_x_server),
+        ('screensaver-settings.desktop',
+         lambda: read_screensaver_autostart(backend))
+    ]
+    sources = dict()
+    unavailable = dict()
+    for name, reader in readers:
+        try:
+            sources[name] = reader()
+        except Exception as error:
+            unavailable[name] = str(error) or error.__class__.__name__
+    return sources, unavailable
+
+
+def compare(sources):
+    """Return the report entries of every setting: the values found in
+    sources and whether they differ."""
+    report = dict()
+    for key, names in SOURCES.items():
+        values = dict((name, sources[name][key]) for name in names
+                      if key in sources.get(name, ()))
+        report[key] = {
+            'drift': len(set(values.values())) > 1,
+            'values': values
+        }
+    return report
+
+
+def verify(backend=None):
+    """Return the divergence report of the settings as a dictionary."""
+    import light_locker_commands
+    from light_locker_backend import LightLockerBackend
+
+    start = time.time()
+    if backend is None:
+        backend = LightLockerBackend()
+    with light_locker_commands.operation('verify', VERIFY_TIMEOUT):
+        sources, unavailable = read_sources(backend)
+    settings = compare(sources)
+    return {
+        'drift': any(entry['drift'] for entry in settings.values()),
+        'elapsed-ms': round((time.time() - start) * 1000, 1),
+        'settings': settings,
+        'unavailable': unavailable
+    }
+
+
+def run():
+    """Print the divergence report, return the exit status: 1 if any
+    setting drifted, 2 if a source was unavailable."""
+    report = verify()
+    sys.stdout.write(json.dumps(report, sort_keys=True) + "\n")
+    if report['drift']:
+        return 1
+    if report['unavailable']:
+        return 2
+    return 0
@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Query and set the X11 screensaver and DPMS timeouts in-process '''
+
+import ctypes
+import ctypes.util
+import threading
+
+
+class X11Error(Exception):
+    """Raised when the X server rejects a request."""
+    pass
+
+
+class X11Unavailable(X11Error):
+    """Raised when libX11/libXext or the display cannot be opened."""
+    pass
+
+
+class XErrorEvent(ctypes.Structure):
+    _fields_ = [('type', ctypes.c_int),
+                ('display', ctypes.c_void_p),
+                ('resourceid', ctypes.c_ulong),
+                ('serial', ctypes.c_ulong),
+                ('error_code', ctypes.c_ubyte),
+                ('request_code', ctypes.c_ubyte),
+                ('minor_code', ctypes.c_ubyte)]
+
+
+XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p,
+                                 ctypes.POINTER(XErrorEvent))
+
+_libx11 = None
+_libxext = None
+
+# XSetErrorHandler() is process-wide: swaps from different threads must not
+# interleave, or one restores the handler of the other.
+_lock = threading.Lock()
+
+
+def _load_library(soname, name):
+    """Load the library soname, looking name up with ctypes.util only if
+    that fails; find_library() runs ldconfig."""
+    try:
+        return ctypes.CDLL(soname)
+    except OSError:
+        pass
+    path = ctypes.util.find_library(name)
+    if path is None:
+        raise X11Unavailable("lib%s not found" % name)
+    try:
+        return ctypes.CDLL(path)
+    except OSError as error:
+        raise X11Unavailable(str(error))
+
+
+def _load_libraries():
+    """Load libX11 and libXext and declare the functions used here."""
+    global _libx11, _libxext
+    if _libx11 is not None:
+        return
+
+    libx11 = _load_library('libX11.so.6', 'X11')
+    libxext = _load_library('libXext.so.6', 'Xext')
+
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+    c_card16_p = ctypes.POINTER(ctypes.c_ushort)
+
+    libx11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    libx11.XOpenDisplay.restype = ctypes.c_void_p
+    libx11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    libx11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    libx11.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+    libx11.XSetErrorHandler.restype = ctypes.c_void_p
+    libx11.XGetScreenSaver.argtypes = [ctypes.c_void_p, c_int_p, c_int_p,
+                                       c_int_p, c_int_p]
+    libx11.XSetScreenSaver.argtypes = [ctypes.c_void_p, ctypes.c_int,
+                                       ctypes.c_int, ctypes.c_int,
+                                       ctypes.c_int]
+
+    libxext.DPMSQueryExtension.argtypes = [ctypes.c_void_p, c_int_p, c_int_p]
+    libxext.DPMSCapable.argtypes = [ctypes.c_void_p]
+    libxext.DPMSGetTimeouts.argtypes = [ctypes.c_void_p, c_card16_p,
+                                        c_card16_p, c_card16_p]
+    libxext.DPMSSetTimeouts.argtypes = [ctypes.c_void_p, ctypes.c_ushort,
+                                        ctypes.c_ushort, ctypes.c_ushort]
+
+    _libx11 = libx11
+    _libxext = libxext
+
+
+class Display:
+    """
+    Connection to the X server for reading and writing the screensaver and
+    DPMS timeouts, replacing the "xset q" and "xset s ... dpms ..." commands.
+    """
+    def __init__(self, name=None):
+        """Open the display name, or $DISPLAY if name is None."""
+        _load_libraries()
+        if name is not None and not isinstance(name, bytes):
+            name = name.encode('utf-8')
+        self.display = _libx11.XOpenDisplay(name)
+        if not self.display:
+            raise X11Unavailable("cannot open display")
+        self.errors = []
+        self._previous_handler = None
+        self._error_handler = XErrorHandler(self._error_cb)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the connection to the X server."""
+        if self.display:
+            _libx11.XCloseDisplay(self.display)
+            self.display = None
+
+    def _error_cb(self, display, event):
+        """Collect protocol errors instead of letting Xlib exit. Errors of
+        other connections, e.g. the one of Gdk on the main thread, are
+        passed on to the handler that was installed before."""
+        if display != self.display:
+            if self._previous_handler:
+                return XErrorHandler(self._previous_handler)(display, event)
+            return 0
+        self.errors.append((event.contents.error_code,
+                            event.contents.request_code,
+                            event.contents.minor_code))
+        return 0
+
+    def _checked(self, func, *args):
+        """Run func, wait for the X server to process the request and raise
+        X11Error if it failed."""
+        with _lock:
+            self.errors = []
+            self._previous_handler = _libx11.XSetErrorHandler(
+                ctypes.cast(self._error_handler, ctypes.c_void_p))
+            try:
+                result = func(self.display, *args)
+                _libx11.XSync(self.display, 0)
+            finally:
+                _libx11.XSetErrorHandler(self._previous_handler)
+                self._previous_handler = None
+        if self.errors:
+            error_code, request_code, minor_code = self.errors[0]
+            raise X11Error("X error %d on request %d.%d" %
+                           (error_code, request_code, minor_code))
+        return result
+
+    def get_screensaver(self):
+        """Return the screensaver (timeout, interval, prefer_blanking,
+        allow_exposures) settings, timeouts in seconds."""
+        values = [ctypes.c_int() for i in range(4)]
+        self._checked(_libx11.XGetScreenSaver,
+                      *[ctypes.byref(value) for value in values])
+        return tuple(value.value for value in values)
+
+    def set_screensaver_timeout(self, timeout):
+        """Set the screensaver timeout in seconds, leave the other
+        screensaver settings as they are."""
+        current, interval, prefer_blanking, allow_exposures = \
+            self.get_screensaver()
+        self._checked(_libx11.XSetScreenSaver, timeout, interval,
+                      prefer_blanking, allow_exposures)
+
+    def dpms_available(self):
+        """Return True if the X server supports DPMS."""
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not _libxext.DPMSQueryExtension(self.display,
+                                           ctypes.byref(event_base),
+                                           ctypes.byref(error_base)):
+            return False
+        return bool(_libxext.DPMSCapable(self.display))
+
+    def get_dpms_timeouts(self):
+        """Return the DPMS (standby, suspend, off) timeouts in seconds, all
+        0 if the X server cannot power the monitor down, e.g. Xvfb or
+        Xvnc."""
+        if not self.dpms_available():
+            return 0, 0, 0
+        values = [ctypes.c_ushort() for i in range(3)]
+        self._checked(_libxext.DPMSGetTimeouts,
+                      *[ctypes.byref(value) for value in values])
+        return tuple(value.value for value in values)
+
+    def set_dpms_timeouts(self, standby, suspend, off):
+        """Set the DPMS timeouts in seconds, return False without setting
+        them if the X server cannot power the monitor down."""
+        if not self.dpms_available():
+            return False
+        self._checked(_libxext.DPMSSetTimeouts, standby, suspend, off)
+        return True
+
+
+def get_screen_timeouts():
+    """Return the screensaver timeout and the DPMS standby timeout in
+    seconds, the values "xset q" reports as "timeout" and "Standby". The
+    DPMS timeout is 0 on X servers without DPMS."""
+    with Display() as display:
+        blank = display.get_screensaver()[0]
+        off = display.get_dpms_timeouts()[0]
+    return blank, off
+
+
+def set_screen_timeouts(blank, off):
+    """Set the screensaver timeout and all DPMS timeouts in seconds, like
+    "xset s <blank> dpms <off> <off> <off>". As with xset, the DPMS
+    timeouts are skipped on X servers without DPMS."""
+    with Display() as display:
+        display.set_screensaver_timeout(blank)
+        display.set_dpms_timeouts(off, off, off)
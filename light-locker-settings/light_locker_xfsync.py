@@ -16,6 +16,106 @@
 #   with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import subprocess
+import threading
+from collections import OrderedDict
+
+import light_locker_commands
+
+try:
+    from gi.repository import Gio, GLib
+except ImportError:
+    Gio = None
+
+XFCONF_BUS_NAME = 'org.xfce.Xfconf'
+XFCONF_OBJECT_PATH = '/org/xfce/Xfconf'
+XFCONF_INTERFACE = 'org.xfce.Xfconf'
+XFCONF_CHANNEL_NOT_FOUND = 'org.xfce.Xfconf.Error.ChannelNotFound'
+
+# Milliseconds to wait for xfconfd before giving up on a call.
+XFCONF_TIMEOUT = 5000
+
+_connection = None
+_connection_failed = False
+
+# Process-wide snapshots of the channels read so far, kept up to date by
+# the Xfconf PropertyChanged/PropertyRemoved signals.
+_channel_cache = dict()
+_channel_cache_lock = threading.Lock()
+_signal_subscription = None
+
+
+class XfconfUnavailable(Exception):
+    """Raised when xfconfd cannot be reached over D-Bus."""
+    pass
+
+
+def xfconf_get_connection():
+    """Return the shared session bus connection, or None if there is no
+    session bus to talk to."""
+    global _connection, _connection_failed
+    if _connection is None and not _connection_failed:
+        if Gio is None:
+            _connection_failed = True
+            return None
+        try:
+            _connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        except GLib.Error:
+            _connection_failed = True
+    return _connection
+
+
+def xfconf_set_connection(connection):
+    """Use the given Gio.DBusConnection for all xfconf calls, e.g. one opened
+    on a private bus with Gio.DBusConnection.new_for_address_sync(). Passing
+    None restores the session bus."""
+    global _connection, _connection_failed, _signal_subscription
+    if _connection is not None and _signal_subscription is not None:
+        _connection.signal_unsubscribe(_signal_subscription)
+    _signal_subscription = None
+    _connection = connection
+    _connection_failed = False
+    xfconf_invalidate()
+
+
+def _xfconf_call(method, parameters, reply_type):
+    """Call a method on the Xfconf D-Bus interface and return the unpacked
+    reply tuple. Raises XfconfUnavailable if xfconfd cannot be reached,
+    GLib.Error for errors reported by xfconfd itself and Cancelled if the
+    running operation was cancelled during the call."""
+    connection = xfconf_get_connection()
+    if connection is None:
+        raise XfconfUnavailable()
+    light_locker_commands.check_cancelled()
+    # Stay within the time left for the running operation.
+    timeout = light_locker_commands.time_left(XFCONF_TIMEOUT / 1000.0)
+    try:
+        with light_locker_commands.cancelled_with(
+                Gio.Cancellable()) as cancellable:
+            reply = connection.call_sync(
+                XFCONF_BUS_NAME, XFCONF_OBJECT_PATH, XFCONF_INTERFACE, method,
+                parameters, GLib.VariantType.new(reply_type),
+                Gio.DBusCallFlags.NONE, max(1, int(timeout * 1000)),
+                cancellable)
+    except GLib.Error as error:
+        light_locker_commands.check_cancelled()
+        remote_error = Gio.DBusError.get_remote_error(error)
+        if remote_error and remote_error.startswith(XFCONF_INTERFACE):
+            raise
+        raise XfconfUnavailable(str(error))
+    return reply.unpack()
+
+
+def to_variant(value, p_type=None):
+    """Wrap a python value in the GVariant type xfconf stores it as."""
+    if p_type is None:
+        p_type = type(value)
+    if p_type is bool:
+        if not isinstance(value, bool):
+            value = str(value).lower() == 'true'
+        return GLib.Variant('b', value)
+    if p_type is int:
+        return GLib.Variant('i', int(value))
+    return GLib.Variant('s', str(value))
 
 
 def convert_value(value):
@@ -28,43 +128,231 @@ def convert_value(value):
     return value
 
 
+def parse_value(value):
+    """Convert xfconf-query output to a python value."""
+    if str.isdigit(value):
+        value = int(value)
+    elif value.lower() in ['true', 'false']:
+        value = value.lower() == 'true'
+    else:
+        value = str(value)
+    return value
+
+
 def xfconf_init_property(channel, p_name, p_type, initial_value):
-    """Initialize the specified xfconf property."""
+    """Initialize the specified xfconf property. Raises
+    subprocess.CalledProcessError if xfconf-query fails."""
+    if xfconf_get_connection() is not None:
+        try:
+            _xfconf_call('SetProperty',
+                         GLib.Variant('(ssv)', (channel, p_name,
+                                                to_variant(initial_value,
+                                                           p_type))),
+                         '()')
+            return
+        except XfconfUnavailable:
+            pass
+
     p_type = p_type.__name__
     initial_value = str(convert_value(initial_value))
     cmd = 'xfconf-query -c %s -p %s -n -s %s -t %s' % (channel, p_name,
                                                        initial_value, p_type)
-    subprocess.call(cmd.split())
+    light_locker_commands.run(cmd.split(), check=True)
 
 
 def xfconf_list_properties(channel):
-    """List the properties defined for the given channel."""
+    """List the properties defined for the given channel, none if it has
+    never been written."""
+    if xfconf_get_connection() is not None:
+        try:
+            properties, = _xfconf_call('GetAllProperties',
+                                       GLib.Variant('(ss)', (channel, '/')),
+                                       '(a{sv})')
+            return properties
+        except XfconfUnavailable:
+            pass
+        except GLib.Error as error:
+            if Gio.DBusError.get_remote_error(error) != \
+                    XFCONF_CHANNEL_NOT_FOUND:
+                raise
+            return dict()
+
     settings = dict()
-    cmd = 'xfconf-query -c %s -l -v' % channel
-    output = subprocess.check_output(cmd, shell=True)
-    if not isinstance(output, str):
-        output = output.decode('utf-8')
+    cmd = ['xfconf-query', '-c', channel, '-l', '-v']
+    output = light_locker_commands.run(cmd, output=True)
     for line in output.split('\n'):
         try:
             key, value = line.split(None, 1)
         except ValueError:
             key = line.strip()
             value = ""
-        if str.isdigit(value):
-            value = int(value)
-        elif value.lower() in ['true', 'false']:
-            value = value.lower() == 'true'
-        else:
-            value = str(value)
-        settings[key] = value
+        settings[key] = parse_value(value)
     return settings
 
 
+def xfconf_get_property(channel, prop, default=None, fallback=True):
+    """Return the value of the specified xfconf property, or default if the
+    property does not exist. Without fallback, XfconfUnavailable is raised
+    instead of running xfconf-query when xfconfd cannot be reached."""
+    if xfconf_get_connection() is not None:
+        try:
+            value, = _xfconf_call('GetProperty',
+                                  GLib.Variant('(ss)', (channel, prop)),
+                                  '(v)')
+            return value
+        except XfconfUnavailable:
+            if not fallback:
+                raise
+        except GLib.Error:
+            # org.xfce.Xfconf.Error.PropertyNotFound
+            return default
+    elif not fallback:
+        raise XfconfUnavailable("no session bus")
+
+    cmd = ['xfconf-query', '-c', channel, '-p', prop]
+    try:
+        output = light_locker_commands.run(cmd, output=True,
+                                           stderr=subprocess.STDOUT)
+    except subprocess.CalledProcessError:
+        return default
+    return parse_value(output.strip())
+
+
 def xfconf_set_property(channel, prop, value):
-    """Set the specified xfconf property."""
+    """Set the specified xfconf property. Raises
+    subprocess.CalledProcessError if xfconf-query fails."""
+    if xfconf_get_connection() is not None:
+        try:
+            _xfconf_call('SetProperty',
+                         GLib.Variant('(ssv)', (channel, prop,
+                                                to_variant(value))),
+                         '()')
+            return
+        except XfconfUnavailable:
+            pass
+
     value = str(value).lower()
     cmd = 'xfconf-query -c %s -p %s -s %s' % (channel, prop, value)
-    subprocess.call(cmd.split())
+    light_locker_commands.run(cmd.split(), check=True)
+
+
+def _xfconf_signal_cb(connection, sender_name, object_path, interface_name,
+                      signal_name, parameters, *user_data):
+    """Keep the channel cache in sync with changes made by other clients."""
+    values = parameters.unpack()
+    channel, prop = values[0], values[1]
+    with _channel_cache_lock:
+        properties = _channel_cache.get(channel)
+        if properties is None:
+            return
+        if signal_name == 'PropertyChanged':
+            properties[prop] = values[2]
+        else:
+            properties.pop(prop, None)
+
+
+def _xfconf_watch():
+    """Subscribe to the Xfconf change signals, return True if the cache will
+    be kept up to date by them."""
+    global _signal_subscription
+    if _signal_subscription is None:
+        connection = xfconf_get_connection()
+        if connection is None:
+            return False
+        _signal_subscription = connection.signal_subscribe(
+            XFCONF_BUS_NAME, XFCONF_INTERFACE, None, XFCONF_OBJECT_PATH,
+            None, Gio.DBusSignalFlags.NONE, _xfconf_signal_cb)
+    return True
+
+
+def xfconf_get_channel(channel):
+    """Return the properties defined for the given channel.
+
+    The channel is listed once per process and served from a shared cache
+    afterwards. With a session bus the cache follows the Xfconf change
+    signals (which are dispatched from the main loop), without one it only
+    sees writes made through this module; use xfconf_invalidate() to force
+    a re-read."""
+    with _channel_cache_lock:
+        properties = _channel_cache.get(channel)
+        if properties is not None:
+            return dict(properties)
+
+    _xfconf_watch()
+    properties = xfconf_list_properties(channel)
+    with _channel_cache_lock:
+        _channel_cache[channel] = dict(properties)
+    return properties
+
+
+def xfconf_invalidate(channel=None):
+    """Drop the cached snapshot of channel, or of every channel."""
+    with _channel_cache_lock:
+        if channel is None:
+            _channel_cache.clear()
+        else:
+            _channel_cache.pop(channel, None)
+
+
+def _xfconf_cache_update(channel, prop, value):
+    """Record a write made through this module in the channel cache."""
+    with _channel_cache_lock:
+        properties = _channel_cache.get(channel)
+        if properties is not None:
+            properties[prop] = value
+
+
+class XfconfTransaction:
+    """
+    Batch of property writes to a single xfconf channel.
+
+    Writes are queued with init_property() and set_property() and sent by
+    commit(). Values that match the cached settings of a property that
+    already exists are dropped, so committing an unchanged batch does not
+    touch xfconf at all.
+    """
+    def __init__(self, channel, settings, current_settings):
+        """Initialize the transaction. settings is the cached dictionary of
+        property values, updated as writes are committed. current_settings
+        are the properties currently defined in the channel."""
+        self.channel = channel
+        self.settings = settings
+        self.existing = set(current_settings.keys())
+        self.pending = OrderedDict()
+
+    def init_property(self, prop, value):
+        """Queue the creation of prop with an initial value, unless it
+        already exists or a write to it is already queued."""
+        if prop not in self.existing and prop not in self.pending:
+            self.pending[prop] = value
+
+    def set_property(self, prop, value):
+        """Queue a write of value to prop."""
+        self.pending[prop] = value
+
+    def is_noop(self, prop, value):
+        """Return True if writing value to prop would not change anything."""
+        if prop not in self.existing or prop not in self.settings:
+            return False
+        current = self.settings[prop]
+        return type(current) is type(value) and current == value
+
+    def commit(self):
+        """Send the queued writes, return the number of writes made."""
+        writes = 0
+        for prop, value in list(self.pending.items()):
+            if self.is_noop(prop, value):
+                continue
+            if prop in self.existing:
+                xfconf_set_property(self.channel, prop, value)
+            else:
+                xfconf_init_property(self.channel, prop, type(value), value)
+                self.existing.add(prop)
+            _xfconf_cache_update(self.channel, prop, value)
+            self.settings[prop] = value
+            writes += 1
+        self.pending.clear()
+        return writes
 
 
 class XfceSessionSync:
@@ -76,21 +364,21 @@ class XfceSessionSync:
         self.settings = {'/shutdown/LockScreen': False}
         current_settings = self._get_xfce4_session_settings()
         self._update_settings(current_settings)
-        self._init_xfconf_properties(current_settings)
+        self.transaction = XfconfTransaction('xfce4-session', self.settings,
+                                             current_settings)
+        self._init_xfconf_properties()
 
-    def _init_xfconf_properties(self, current_settings):
+    def _init_xfconf_properties(self):
         """If xfce4-session has not been configured, some of its properties
-        may not exist. Create any missing properties."""
-        channel = 'xfce4-session'
+        may not exist. Queue the creation of any missing properties, they
+        are written with the next committed change."""
         for key, value in list(self.settings.items()):
-            val_type = type(value)
-            if key not in list(current_settings.keys()):
-                xfconf_init_property(channel, key, val_type, value)
+            self.transaction.init_property(key, value)
 
     @staticmethod
     def _get_xfce4_session_settings():
         """Return a dictionary of the xfce4-session settings."""
-        return xfconf_list_properties('xfce4-session')
+        return xfconf_get_channel('xfce4-session')
 
     def _update_settings(self, settings):
         """Update the internal settings."""
@@ -104,8 +392,8 @@ class XfceSessionSync:
 
     def set_lock(self, value):
         """Set the Lock on Sleep setting."""
-        xfconf_set_property('xfce4-session', '/shutdown/LockScreen', value)
-        self.settings['/shutdown/LockScreen'] = value
+        self.transaction.set_property('/shutdown/LockScreen', value)
+        self.transaction.commit()
 
 
 class XfpmSync:
@@ -120,22 +408,23 @@ class XfpmSync:
                          }
         current_settings = self._get_xfpm_settings()
         self._update_settings(current_settings)
-        self._init_xfconf_properties(current_settings)
+        self.transaction = XfconfTransaction('xfce4-power-manager',
+                                             self.settings, current_settings)
+        self._init_xfconf_properties()
 
-    def _init_xfconf_properties(self, current_settings):
+    def _init_xfconf_properties(self):
         """
         If xfpm has never been used, some xfconf channel properties may not be
-        set. Ensures that we don't get complains about missing properties.
+        set. Ensures that we don't get complains about missing properties by
+        queueing their creation with the next committed change.
         """
-        channel = 'xfce4-power-manager'
         for key, value in list(self.settings.items()):
-            if key not in list(current_settings.keys()):
-                xfconf_init_property(channel, key, type(value), value)
+            self.transaction.init_property(key, value)
 
     @staticmethod
     def _get_xfpm_settings():
         """Returns xfpm xfconf settings as string"""
-        return xfconf_list_properties('xfce4-power-manager')
+        return xfconf_get_channel('xfce4-power-manager')
 
     def _update_settings(self, settings):
         """Update the internal settings."""
@@ -151,13 +440,13 @@ class XfpmSync:
     def set_lock(self, value):
         """Set the Lock on Suspend/Hibernate setting."""
         prop_name = '/xfce4-power-manager/lock-screen-suspend-hibernate'
-        xfconf_set_property('xfce4-power-manager', prop_name, value)
-        self.settings[prop_name] = value
+        self.transaction.set_property(prop_name, value)
 
         # The below setting is required to avoid the dreaded "black screen bug"
         # where the session does not properly suspend after hibernation.
         # If this setting is True, logind will handle the lid-switch event.
         # This setting should be True when lock on suspend is enabled.
         prop_name = '/xfce4-power-manager/logind-handle-lid-switch'
-        xfconf_set_property('xfce4-power-manager', prop_name, value)
-        self.settings[prop_name] = value
+        self.transaction.set_property(prop_name, value)
+
+        self.transaction.commit()
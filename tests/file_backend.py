@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Settings daemon serving a backend kept in a JSON file, run by
+test_daemon.py on a private bus:
+
+    file_backend.py STATE
+
+STATE holds {"settings": {...}, "delay": seconds, "fail": bool}. Writes
+sleep for delay seconds and raise WriteError if fail is set. Every read
+appends the sorted list of keys asked for to STATE.reads, one JSON list
+per line. '''
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+import light_locker_daemon
+from light_locker_backend import LOCK_SETTINGS, SCREEN_BLANK_SETTINGS, \
+    LightLockerBackend, WriteError
+
+
+class FileBackend(LightLockerBackend):
+    """LightLockerBackend storing the settings in a JSON file."""
+
+    def __init__(self, path):
+        LightLockerBackend.__init__(self)
+        self.path = path
+
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def get_settings(self, keys=None, write=False):
+        if keys is None:
+            keys = LOCK_SETTINGS + SCREEN_BLANK_SETTINGS
+        with open(self.path + '.reads', 'a') as reads:
+            reads.write(json.dumps(sorted(keys)) + '\n')
+        settings = self.load()['settings']
+        return dict((key, settings[key]) for key in keys)
+
+    def write_settings(self, settings, changed=None, progress=None):
+        state = self.load()
+        time.sleep(state.get('delay', 0))
+        if state.get('fail'):
+            raise WriteError({'light-locker': IOError("not writable")},
+                             set())
+        for key in changed or settings:
+            state['settings'][key] = settings[key]
+        with open(self.path, 'w') as f:
+            json.dump(state, f)
+
+
+if __name__ == "__main__":
+    sys.exit(light_locker_daemon.run(FileBackend(sys.argv[1])))
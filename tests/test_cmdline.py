@@ -0,0 +1,189 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' The light-locker Exec line codec: every form seen in the field, and a
+few thousand random lines built from the same words, must serialize back
+to the text they were parsed from, parse to the expected values and keep
+every other word through an update. '''
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+import light_locker_cmdline
+
+# Exec lines with their expected (lock-after-screensaver, late-locking,
+# lock-on-suspend) values.
+FIELD_FORMS = [
+    ("", (None, None, None)),
+    ("light-locker", (None, None, None)),
+    ("light-locker --lock-after-screensaver=300 --no-lock-on-suspend "
+     "--no-late-locking", (300, False, False)),
+    ("light-locker --lock-after-screensaver=0 --lock-on-suspend "
+     "--late-locking", (0, True, True)),
+    ("light-locker --lock-after-screensaver 60 --lock-on-suspend",
+     (60, None, True)),
+    ("light-locker --lock-on-lid --idle-hint --lock-after-screensaver=5",
+     (5, None, None)),
+    ("/usr/bin/light-locker --late-locking --no-late-locking",
+     (None, False, None)),
+    ("light-locker --lock-after-screensaver=10 --lock-after-screensaver 20",
+     (20, None, None)),
+    ("light-locker --lock-after-screensaver=abc", (None, None, None)),
+    ("light-locker '--lock-after-screensaver=30' \"--lock-on-suspend\"",
+     (30, None, True)),
+    ("  light-locker\t--debug  --lock-after-screensaver  90  ",
+     (90, None, None)),
+    ("env LANG=C light-locker --no-lock-on-suspend", (None, None, False)),
+    ("env LANG=C light-locker --lock-after-screensaver 45",
+     (45, None, None)),
+    ("light-locker --lock-after-screensaver --lock-on-suspend",
+     (None, None, True)),
+]
+
+RANDOM_WORDS = [
+    "--lock-after-screensaver=0", "--lock-after-screensaver=300",
+    "--lock-after-screensaver 15", "--late-locking", "--no-late-locking",
+    "--lock-on-suspend", "--no-lock-on-suspend", "--lock-on-lid",
+    "--no-idle-hint", "--debug", "'quoted word'", '"double quoted"',
+    "escaped\\ space", "--unknown=1",
+]
+RANDOM_SPACES = [" ", "  ", "\t"]
+RANDOM_LINES = 5000
+
+MANAGED = ('--lock-after-screensaver', '--late-locking', '--no-late-locking',
+           '--lock-on-suspend', '--no-lock-on-suspend')
+
+
+def values(line):
+    return (line.get('lock-after-screensaver'), line.get('late-locking'),
+            line.get('lock-on-suspend'))
+
+
+def unmanaged_words(line):
+    """Return the arguments of line not managed by the codec."""
+    words = []
+    argv = line.argv()[1:]
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--lock-after-screensaver':
+            if i + 1 < len(argv) and not argv[i + 1].startswith('-'):
+                i += 1
+        elif not argv[i].startswith(MANAGED):
+            words.append(argv[i])
+        i += 1
+    return words
+
+
+def random_line(rng):
+    """Return a random Exec line made of RANDOM_WORDS."""
+    words = ["light-locker"] + [rng.choice(RANDOM_WORDS)
+                                for i in range(rng.randint(0, 6))]
+    text = rng.choice(["", " "])
+    for word in words:
+        text += word + rng.choice(RANDOM_SPACES)
+    return text[:rng.randint(len(text) - 1, len(text))]
+
+
+class ExecLineTest(unittest.TestCase):
+
+    def check_line(self, text):
+        """Round trip text and update it."""
+        line = light_locker_cmdline.parse(text)
+        self.assertEqual(str(line), text)
+        # Lines without a program are replaced rather than updated.
+        if not line.words():
+            return
+
+        unmanaged = unmanaged_words(line)
+        line.set('lock-after-screensaver', 120)
+        line.set('late-locking', True)
+        line.set('lock-on-suspend', False)
+        updated = light_locker_cmdline.parse(str(line))
+        self.assertEqual(values(updated), (120, True, False), str(line))
+        self.assertEqual(unmanaged_words(updated), unmanaged, str(line))
+
+    def test_field_forms(self):
+        for text, expected in FIELD_FORMS:
+            self.assertEqual(values(light_locker_cmdline.parse(text)),
+                             expected, text)
+            self.check_line(text)
+
+    def test_random_lines(self):
+        rng = random.Random(0)
+        for i in range(RANDOM_LINES):
+            self.check_line(random_line(rng))
+
+    def test_update_keeps_unknown_words_and_quoting(self):
+        line = light_locker_cmdline.parse(
+            "light-locker  --debug 'quoted word' --lock-after-screensaver=5")
+        line.set('lock-after-screensaver', 10)
+        self.assertEqual(
+            str(line),
+            "light-locker  --debug 'quoted word' --lock-after-screensaver=10")
+
+    def test_update_keeps_form(self):
+        line = light_locker_cmdline.parse(
+            "light-locker --lock-after-screensaver 5")
+        line.set('lock-after-screensaver', 10)
+        self.assertEqual(str(line), "light-locker --lock-after-screensaver 10")
+
+        line = light_locker_cmdline.parse(
+            "light-locker --lock-after-screensaver=5 --no-late-locking")
+        line.set('lock-after-screensaver', 10)
+        line.set('late-locking', True)
+        self.assertEqual(
+            str(line), "light-locker --lock-after-screensaver=10 "
+            "--late-locking")
+
+    def test_last_occurrence_wins(self):
+        line = light_locker_cmdline.parse(
+            "light-locker --lock-on-suspend --lock-after-screensaver=10 "
+            "--no-lock-on-suspend --lock-after-screensaver 20")
+        self.assertEqual(values(line), (20, None, False))
+        line.set('lock-after-screensaver', 30)
+        line.set('lock-on-suspend', True)
+        self.assertEqual(
+            str(line), "light-locker --lock-on-suspend "
+            "--lock-after-screensaver=10 --lock-on-suspend "
+            "--lock-after-screensaver 30")
+
+    def test_option_is_not_a_value(self):
+        line = light_locker_cmdline.parse(
+            "light-locker --lock-after-screensaver --lock-on-suspend")
+        self.assertEqual(values(line), (None, None, True))
+        line.set('lock-after-screensaver', 60)
+        self.assertEqual(
+            str(line), "light-locker --lock-after-screensaver=60 "
+            "--lock-on-suspend")
+
+    def test_wrapped_command(self):
+        line = light_locker_cmdline.parse("env LANG=C light-locker --debug")
+        self.assertEqual(line.command_index(), 5)
+        line.set('late-locking', False)
+        self.assertEqual(str(line),
+                         "env LANG=C light-locker --debug --no-late-locking")
+        self.assertIsNone(light_locker_cmdline.parse(
+            "xscreensaver -nosplash").command_index())
+
+
+if __name__ == "__main__":
+    unittest.main()
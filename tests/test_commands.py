@@ -0,0 +1,80 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Deadlines and cancellation of operations. '''
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+import light_locker_commands
+
+try:
+    from gi.repository import Gio
+except ImportError:
+    Gio = None
+
+
+class OperationTest(unittest.TestCase):
+
+    def test_time_left(self):
+        self.assertEqual(light_locker_commands.time_left(5), 5)
+        with light_locker_commands.operation('test', 1):
+            self.assertLessEqual(light_locker_commands.time_left(5), 1)
+            self.assertEqual(light_locker_commands.time_left(0.5), 0.5)
+
+    @unittest.skipUnless(Gio is not None, "needs PyGObject")
+    def test_cancelled_with(self):
+        with light_locker_commands.operation('test') as op:
+            with light_locker_commands.cancelled_with(
+                    Gio.Cancellable()) as cancellable:
+                threading.Timer(0.05, op.cancel).start()
+                deadline = time.time() + 2
+                while not cancellable.is_cancelled() and \
+                        time.time() < deadline:
+                    time.sleep(0.01)
+                self.assertTrue(cancellable.is_cancelled())
+            self.assertEqual(op.cancellables, set())
+
+            # Already cancelled when registered.
+            with light_locker_commands.cancelled_with(
+                    Gio.Cancellable()) as cancellable:
+                self.assertTrue(cancellable.is_cancelled())
+
+    def test_supervisor_wait_obeys_deadline(self):
+        import light_locker_supervisor
+
+        process = subprocess.Popen(['sleep', '5'])
+        try:
+            start = time.time()
+            with light_locker_commands.operation('test', 0.2):
+                self.assertFalse(light_locker_supervisor.wait_for_exit(
+                    process.pid, light_locker_supervisor.STOP_TIMEOUT))
+            self.assertLess(time.time() - start, 1)
+        finally:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()
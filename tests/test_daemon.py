@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' The settings daemon, run on a private dbus-daemon with the backend of
+file_backend.py. '''
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR),
+                                'light-locker-settings'))
+
+try:
+    from gi.repository import GLib, Gio
+except ImportError:
+    GLib = None
+
+DBUS_DAEMON = shutil.which('dbus-daemon') if hasattr(shutil, 'which') \
+    else None
+
+SETTINGS = {
+    'lock-enabled': True,
+    'late-locking': False,
+    'lock-after-screensaver': 300,
+    'lock-on-suspend': False,
+    'screen-blank-timeout': 600,
+    'screen-off-timeout': 900
+}
+
+
+def wait_for(condition, timeout=5):
+    """Iterate the main context until condition() is true, return its
+    result."""
+    context = GLib.MainContext.default()
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        context.iteration(False)
+        time.sleep(0.01)
+    return condition()
+
+
+@unittest.skipUnless(GLib is not None and DBUS_DAEMON,
+                     "needs PyGObject and dbus-daemon")
+class DaemonTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+        for name in ('config', 'cache', 'run'):
+            os.mkdir(os.path.join(cls.root, name))
+        cls.autostart = os.path.join(cls.root, 'config', 'autostart')
+        os.mkdir(cls.autostart)
+        os.environ['XDG_CONFIG_HOME'] = os.path.join(cls.root, 'config')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(cls.root, 'cache')
+        os.environ['XDG_RUNTIME_DIR'] = os.path.join(cls.root, 'run')
+
+        cls.bus = subprocess.Popen(
+            [DBUS_DAEMON, '--session', '--nofork', '--print-address=1'],
+            stdout=subprocess.PIPE)
+        address = cls.bus.stdout.readline().decode('utf-8').strip()
+        os.environ['DBUS_SESSION_BUS_ADDRESS'] = address
+
+        import light_locker_daemon
+        cls.daemon_module = light_locker_daemon
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bus.terminate()
+        cls.bus.wait()
+        cls.bus.stdout.close()
+        shutil.rmtree(cls.root)
+
+    def setUp(self):
+        self.state_file = os.path.join(self.root, 'state.json')
+        self.save_state({'settings': dict(SETTINGS)})
+        if os.path.exists(self.state_file + '.reads'):
+            os.remove(self.state_file + '.reads')
+
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(TESTS_DIR, 'file_backend.py'),
+             self.state_file])
+        self.assertTrue(wait_for(
+            lambda: self.daemon_module.Client.connect() is not None),
+            "the daemon did not start")
+        self.client = self.daemon_module.Client.connect()
+
+    def tearDown(self):
+        self.process.terminate()
+        self.process.wait()
+        wait_for(lambda: self.daemon_module.Client.connect() is None)
+
+    def save_state(self, state):
+        with open(self.state_file, 'w') as f:
+            json.dump(state, f)
+
+    def load_state(self):
+        with open(self.state_file) as f:
+            return json.load(f)
+
+    def reads(self):
+        with open(self.state_file + '.reads') as f:
+            return [json.loads(line) for line in f]
+
+    def test_get_all(self):
+        self.assertEqual(self.client.get_all(), SETTINGS)
+        self.assertEqual(self.client.get('lock-after-screensaver'), 300)
+
+    def test_apply_writes_and_signals(self):
+        changes = []
+        self.client.subscribe(changes.append)
+        self.assertEqual(self.client.apply({'lock-on-suspend': True,
+                                            'late-locking': False}),
+                         ['lock-on-suspend'])
+        self.assertTrue(self.load_state()['settings']['lock-on-suspend'])
+        self.assertTrue(self.client.get('lock-on-suspend'))
+        self.assertTrue(wait_for(lambda: changes))
+        self.assertEqual(changes, [{'lock-on-suspend': True}])
+
+    def test_set(self):
+        self.client.set('screen-blank-timeout', 60)
+        self.assertEqual(self.client.get('screen-blank-timeout'), 60)
+
+    def test_no_lock_delay_disables_late_locking(self):
+        self.client.apply({'late-locking': True})
+        self.assertEqual(sorted(self.client.apply(
+            {'lock-after-screensaver': 0})),
+            ['late-locking', 'lock-after-screensaver'])
+
+    def test_get_during_slow_apply(self):
+        state = self.load_state()
+        state['delay'] = 2
+        self.save_state(state)
+        replies = []
+        self.client.connection.call(
+            self.daemon_module.BUS_NAME, self.daemon_module.OBJECT_PATH,
+            self.daemon_module.INTERFACE, 'Apply',
+            GLib.Variant('(a{sv})', ({'lock-on-suspend':
+                                      GLib.Variant('b', True)},)),
+            GLib.VariantType.new('(as)'), Gio.DBusCallFlags.NONE, 10000,
+            None, lambda connection, result: replies.append(
+                connection.call_finish(result).unpack()[0]))
+        time.sleep(0.2)
+
+        start = time.time()
+        self.assertFalse(self.client.get('lock-on-suspend'))
+        self.assertLess(time.time() - start, 0.5)
+
+        self.assertTrue(wait_for(lambda: replies))
+        self.assertEqual(replies, [['lock-on-suspend']])
+        self.assertTrue(self.client.get('lock-on-suspend'))
+
+    def test_unknown_key(self):
+        with self.assertRaises(GLib.Error) as context:
+            self.client.get('no-such-setting')
+        self.assertIn('UnknownKey', context.exception.message)
+
+    def test_invalid_value(self):
+        with self.assertRaises(GLib.Error) as context:
+            self.client.apply({'lock-enabled': 3})
+        self.assertIn('InvalidValue', context.exception.message)
+
+    def test_failed_write(self):
+        state = self.load_state()
+        state['fail'] = True
+        self.save_state(state)
+        with self.assertRaises(GLib.Error) as context:
+            self.client.apply({'lock-on-suspend': True})
+        self.assertIn('not writable', context.exception.message)
+        self.assertFalse(self.client.get('lock-on-suspend'))
+
+    def test_source_change_reads_its_settings_only(self):
+        changes = []
+        self.client.subscribe(changes.append)
+        state = self.load_state()
+        state['settings']['lock-enabled'] = False
+        self.save_state(state)
+
+        path = os.path.join(self.autostart, 'light-locker.desktop')
+        with open(path, 'w') as f:
+            f.write("[Desktop Entry]\nExec=\n")
+
+        self.assertTrue(wait_for(lambda: changes))
+        self.assertEqual(changes, [{'lock-enabled': False}])
+        self.assertEqual(self.reads()[-1],
+                         sorted(['lock-enabled', 'late-locking',
+                                 'lock-after-screensaver',
+                                 'lock-on-suspend']))
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Writing the light-locker GSettings keys in one transaction, against a
+compiled copy of the schema and the memory GSettings backend. '''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+try:
+    from gi.repository import GLib, Gio
+except ImportError:
+    GLib = None
+
+GLIB_COMPILE_SCHEMAS = shutil.which('glib-compile-schemas') \
+    if hasattr(shutil, 'which') else None
+
+# The keys of the schema installed by light-locker.
+SCHEMA = '''<?xml version="1.0" encoding="UTF-8"?>
+<schemalist>
+  <schema id="apps.light-locker" path="/apps/light-locker/">
+    <key name="late-locking" type="b">
+      <default>false</default>
+    </key>
+    <key name="lock-on-suspend" type="b">
+      <default>false</default>
+    </key>
+    <key name="lock-after-screensaver" type="u">
+      <default>5</default>
+    </key>
+  </schema>
+</schemalist>
+'''
+
+KEYS = ['late-locking', 'lock-after-screensaver', 'lock-on-suspend']
+
+SETTINGS = {
+    'lock-enabled': True,
+    'late-locking': True,
+    'lock-after-screensaver': 300,
+    'lock-on-suspend': True
+}
+
+schema_dir = None
+
+
+def setUpModule():
+    # GSettings reads GSETTINGS_SCHEMA_DIR when the schemas are first used.
+    global schema_dir
+    if GLib is None or not GLIB_COMPILE_SCHEMAS:
+        return
+    schema_dir = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+    with open(os.path.join(schema_dir, 'apps.light-locker.gschema.xml'),
+              'w') as f:
+        f.write(SCHEMA)
+    subprocess.check_call([GLIB_COMPILE_SCHEMAS, schema_dir])
+    os.environ['GSETTINGS_SCHEMA_DIR'] = schema_dir
+
+
+def tearDownModule():
+    if schema_dir is not None:
+        del os.environ['GSETTINGS_SCHEMA_DIR']
+        shutil.rmtree(schema_dir)
+
+
+def iterate(timeout=0.2):
+    """Dispatch the pending GSettings signals."""
+    context = GLib.MainContext.default()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        while context.iteration(False):
+            pass
+        time.sleep(0.01)
+
+
+@unittest.skipUnless(GLib is not None and GLIB_COMPILE_SCHEMAS,
+                     "needs PyGObject and glib-compile-schemas")
+class GSettingsTest(unittest.TestCase):
+
+    def setUp(self):
+        import light_locker_backend
+        import light_locker_capabilities
+        light_locker_capabilities.recheck()
+        self.backend_module = light_locker_backend
+
+        self.autostart = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+        self.autostart_dir = light_locker_backend.get_user_autostart_dir
+        light_locker_backend.get_user_autostart_dir = lambda: self.autostart
+
+        self.gsettings_backend = Gio.memory_settings_backend_new()
+        self.backend = light_locker_backend.LightLockerBackend(
+            self.gsettings_backend)
+        self.backend.gsettings_init()
+        self.assertTrue(self.backend.gsettings_available())
+
+        # A second client of the same backend, as light-locker would be.
+        self.watcher = Gio.Settings.new_with_backend('apps.light-locker',
+                                                     self.gsettings_backend)
+        self.events = []
+        self.watcher.connect('change-event', self.change_event_cb)
+
+    def tearDown(self):
+        self.backend_module.get_user_autostart_dir = self.autostart_dir
+        shutil.rmtree(self.autostart)
+
+    def change_event_cb(self, settings, keys, n_keys):
+        self.events.append(sorted(GLib.quark_to_string(key)
+                                  for key in keys or []))
+        return False
+
+    def values(self):
+        return [self.watcher.get_value(key).unpack() for key in KEYS]
+
+    def test_one_apply_is_one_change(self):
+        self.backend.apply_light_locker_settings(SETTINGS)
+        iterate()
+        self.assertEqual(self.values(), [True, 300, True])
+        self.assertEqual(self.events, [KEYS])
+
+    def test_failed_write_reverts(self):
+        self.backend.gsettings_set_lock_on_suspend = lambda enable: False
+        with self.assertRaises(self.backend_module.GSettingsError) as context:
+            self.backend.apply_light_locker_settings(SETTINGS)
+        self.assertEqual(context.exception.keys, ['lock-on-suspend'])
+        iterate()
+        self.assertEqual(self.values(), [False, 5, False])
+        self.assertEqual(self.events, [])
+        self.assertFalse(self.backend.gsettings.get_has_unapplied())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Bulk provisioning into temporary home directories. '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+try:
+    from gi.repository import GLib
+except ImportError:
+    GLib = None
+
+POLICY = {
+    'lock-enabled': True,
+    'late-locking': False,
+    'lock-after-screensaver': 300,
+    'lock-on-suspend': True
+}
+
+LIGHT_LOCKER_DESKTOP = os.path.join('.config', 'autostart',
+                                    'light-locker.desktop')
+
+# The owner given to homes in the root only tests.
+NOBODY = 65534
+
+
+@unittest.skipUnless(GLib is not None, "needs PyGObject")
+class ProvisionTest(unittest.TestCase):
+
+    def setUp(self):
+        import light_locker_provision
+        self.provision = light_locker_provision
+        self.root = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+        os.chmod(self.root, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_home(self, name):
+        home = os.path.join(self.root, name)
+        os.mkdir(home)
+        return home
+
+    def run_provision(self, homes, policy=POLICY):
+        return dict((home, (status, message)) for home, status, message in
+                    self.provision.provision(homes, policy, jobs=2))
+
+    def read(self, path):
+        keyfile = GLib.KeyFile.new()
+        keyfile.load_from_file(path, GLib.KeyFileFlags.NONE)
+        return keyfile
+
+    def test_changed_then_unchanged(self):
+        homes = [self.make_home('a'), self.make_home('b')]
+        results = self.run_provision(homes)
+        for home in homes:
+            self.assertEqual(results[home],
+                             ('changed', LIGHT_LOCKER_DESKTOP))
+            exec_line = self.read(os.path.join(
+                home, LIGHT_LOCKER_DESKTOP)).get_value('Desktop Entry',
+                                                       'Exec')
+            self.assertIn('--lock-after-screensaver=300', exec_line)
+            self.assertIn('--lock-on-suspend', exec_line)
+            self.assertFalse(os.path.exists(
+                os.path.join(home, '.config', 'glib-2.0')))
+
+        results = self.run_provision(homes)
+        for home in homes:
+            self.assertEqual(results[home], ('unchanged', ''))
+
+    def test_keeps_other_keys(self):
+        home = self.make_home('a')
+        os.makedirs(os.path.join(home, '.config', 'autostart'))
+        path = os.path.join(home, LIGHT_LOCKER_DESKTOP)
+        with open(path, 'w') as f:
+            f.write("[Desktop Entry]\nName=Mine\nExec=light-locker\n"
+                    "X-Custom=1\n")
+        self.assertEqual(self.run_provision([home])[home][0], 'changed')
+        keyfile = self.read(path)
+        self.assertEqual(keyfile.get_value('Desktop Entry', 'Name'), 'Mine')
+        self.assertEqual(keyfile.get_value('Desktop Entry', 'X-Custom'), '1')
+
+    def test_refuses_symlinked_directory(self):
+        home = self.make_home('a')
+        target = os.path.join(self.root, 'target')
+        os.mkdir(target)
+        os.mkdir(os.path.join(home, '.config'))
+        os.symlink(target, os.path.join(home, '.config', 'autostart'))
+
+        status, message = self.run_provision([home])[home]
+        self.assertEqual(status, 'failed')
+        self.assertIn('leaves the home directory', message)
+        self.assertEqual(os.listdir(target), [])
+
+    def test_refuses_symlinked_file(self):
+        home = self.make_home('a')
+        target = os.path.join(self.root, 'target')
+        with open(target, 'w') as f:
+            f.write("untouched\n")
+        os.makedirs(os.path.join(home, '.config', 'autostart'))
+        os.symlink(target, os.path.join(home, LIGHT_LOCKER_DESKTOP))
+
+        self.assertEqual(self.run_provision([home])[home][0], 'failed')
+        with open(target) as f:
+            self.assertEqual(f.read(), "untouched\n")
+
+    def test_missing_home(self):
+        home = os.path.join(self.root, 'missing')
+        self.assertEqual(self.run_provision([home])[home][0], 'failed')
+        self.assertFalse(os.path.exists(home))
+
+    def test_incomplete_policy(self):
+        with self.assertRaises(ValueError):
+            self.provision.check_policy({'lock-enabled': True})
+        with self.assertRaises(ValueError):
+            self.provision.check_policy(dict())
+
+    @unittest.skipUnless(os.getuid() == 0, "needs root")
+    def test_root_writes_as_owner(self):
+        home = self.make_home('a')
+        os.chown(home, NOBODY, NOBODY)
+        self.assertEqual(self.run_provision([home])[home][0], 'changed')
+        for path in (os.path.join(home, '.config'),
+                     os.path.join(home, LIGHT_LOCKER_DESKTOP)):
+            self.assertEqual(os.stat(path).st_uid, NOBODY)
+
+    @unittest.skipUnless(os.getuid() == 0, "needs root")
+    def test_root_cannot_follow_symlink(self):
+        # The owner may point the link anywhere, root must not follow it.
+        home = self.make_home('a')
+        os.chown(home, NOBODY, NOBODY)
+        target = os.path.join(self.root, 'target')
+        os.mkdir(target, 0o700)
+        os.symlink(target, os.path.join(home, '.config'))
+
+        self.assertEqual(self.run_provision([home])[home][0], 'failed')
+        self.assertEqual(os.listdir(target), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Finding and starting light-locker while another program owns its bus
+name, on a private dbus-daemon. '''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+import light_locker_commands
+
+try:
+    from gi.repository import GLib, Gio
+except ImportError:
+    GLib = None
+
+DBUS_DAEMON = shutil.which('dbus-daemon') if hasattr(shutil, 'which') \
+    else None
+
+
+@unittest.skipUnless(GLib is not None and DBUS_DAEMON,
+                     "needs PyGObject and dbus-daemon")
+class SupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        import light_locker_supervisor
+        self.supervisor = light_locker_supervisor
+
+        self.bus = subprocess.Popen(
+            [DBUS_DAEMON, '--session', '--nofork', '--print-address=1'],
+            stdout=subprocess.PIPE)
+        address = self.bus.stdout.readline().decode('utf-8').strip()
+        self.connection = Gio.DBusConnection.new_for_address_sync(
+            address, Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT |
+            Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION, None, None)
+
+        # This process plays the other screensaver.
+        name = light_locker_supervisor.LIGHT_LOCKER_BUS_NAME
+        self.connection.call_sync(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus',
+            'org.freedesktop.DBus', 'RequestName',
+            GLib.Variant('(su)', (name, 0)),
+            GLib.VariantType.new('(u)'), Gio.DBusCallFlags.NONE, 1000, None)
+
+        self.root = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+        self.light_locker = os.path.join(self.root, 'light-locker')
+        with open(self.light_locker, 'w') as f:
+            f.write("#!/bin/sh\nexec sleep 30\n")
+        os.chmod(self.light_locker, 0o755)
+
+        self.saved = (light_locker_supervisor.get_connection,
+                      light_locker_supervisor.get_pidfile)
+        light_locker_supervisor.get_connection = lambda: self.connection
+        light_locker_supervisor.get_pidfile = \
+            lambda: os.path.join(self.root, 'light-locker.pid')
+
+    def tearDown(self):
+        self.supervisor.get_connection, self.supervisor.get_pidfile = \
+            self.saved
+        self.connection.close_sync(None)
+        self.bus.terminate()
+        self.bus.wait()
+        self.bus.stdout.close()
+        shutil.rmtree(self.root)
+
+    def test_other_owner_is_not_certain(self):
+        self.assertEqual(self.supervisor.find_light_locker(), ([], False))
+
+    def test_start_fails_next_to_other_owner(self):
+        start = time.time()
+        with light_locker_commands.operation('test', 0.3):
+            with self.assertRaises(self.supervisor.SupervisorError) as context:
+                self.supervisor.start([self.light_locker])
+        self.assertIn('owned by another program', str(context.exception))
+        self.assertLess(time.time() - start, 2)
+        self.assertIsNone(self.supervisor.read_pidfile())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' The in-process X11 timeouts, run against Xvfb, which has no DPMS. '''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'light-locker-settings'))
+
+try:
+    from gi.repository import GLib
+except ImportError:
+    GLib = None
+
+XVFB = shutil.which('Xvfb') if hasattr(shutil, 'which') else None
+
+
+@unittest.skipUnless(GLib is not None and XVFB, "needs PyGObject and Xvfb")
+class XvfbTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = subprocess.Popen(
+            [XVFB, '-displayfd', '1', '-nolisten', 'tcp'],
+            stdout=subprocess.PIPE)
+        cls.display = os.environ.get('DISPLAY')
+        os.environ['DISPLAY'] = \
+            ':' + cls.server.stdout.readline().decode('utf-8').strip()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        cls.server.stdout.close()
+        if cls.display is None:
+            del os.environ['DISPLAY']
+        else:
+            os.environ['DISPLAY'] = cls.display
+
+    def setUp(self):
+        import light_locker_backend
+        self.backend_module = light_locker_backend
+        self.autostart = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+        self.autostart_dir = light_locker_backend.get_user_autostart_dir
+        light_locker_backend.get_user_autostart_dir = lambda: self.autostart
+
+        self.backend = light_locker_backend.LightLockerBackend()
+        self.commands = []
+        self.backend.run_command = \
+            lambda cmd, check_output=False: self.commands.append(cmd)
+
+    def tearDown(self):
+        self.backend_module.get_user_autostart_dir = self.autostart_dir
+        shutil.rmtree(self.autostart)
+
+    def test_timeouts_without_dpms(self):
+        import light_locker_x11
+
+        light_locker_x11.set_screen_timeouts(120, 300)
+        self.assertEqual(light_locker_x11.get_screen_timeouts(), (120, 0))
+
+    def test_read_does_not_run_xset(self):
+        self.backend.get_screen_blank_timeout()
+        self.assertEqual(self.commands, [])
+
+    def test_apply_saves_autostart(self):
+        self.backend.apply_screen_blank_settings(
+            {'screen-blank-timeout': 600, 'screen-off-timeout': 900})
+        self.assertEqual(self.commands, [])
+        keyfile = GLib.KeyFile.new()
+        keyfile.load_from_file(
+            os.path.join(self.autostart, 'screensaver-settings.desktop'),
+            GLib.KeyFileFlags.NONE)
+        self.assertEqual(keyfile.get_value('Desktop Entry', 'Exec'),
+                         "xset s 600 dpms 900 900 900")
+
+
+if __name__ == "__main__":
+    unittest.main()
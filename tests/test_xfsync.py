@@ -0,0 +1,161 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' The xfconf D-Bus client, run against xfconf_service.py on a private
+dbus-daemon. '''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR),
+                                'light-locker-settings'))
+
+try:
+    from gi.repository import GLib, Gio
+except ImportError:
+    GLib = None
+
+DBUS_DAEMON = shutil.which('dbus-daemon') if hasattr(shutil, 'which') \
+    else None
+
+LOCK = '/xfce4-power-manager/lock-screen-suspend-hibernate'
+
+
+def wait_for(condition, timeout=5):
+    """Iterate the main context until condition() is true, return its
+    result."""
+    context = GLib.MainContext.default()
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        context.iteration(False)
+        time.sleep(0.01)
+    return condition()
+
+
+@unittest.skipUnless(GLib is not None and DBUS_DAEMON,
+                     "needs PyGObject and dbus-daemon")
+class XfsyncTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bus = subprocess.Popen(
+            [DBUS_DAEMON, '--session', '--nofork', '--print-address=1'],
+            stdout=subprocess.PIPE)
+        cls.address = cls.bus.stdout.readline().decode('utf-8').strip()
+
+        import light_locker_xfsync
+        cls.xfsync = light_locker_xfsync
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.xfsync.xfconf_set_connection(None)
+        cls.bus.terminate()
+        cls.bus.wait()
+        cls.bus.stdout.close()
+
+    def connect(self):
+        return Gio.DBusConnection.new_for_address_sync(
+            self.address,
+            Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT |
+            Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION, None, None)
+
+    def setUp(self):
+        env = dict(os.environ, DBUS_SESSION_BUS_ADDRESS=self.address)
+        self.service = subprocess.Popen(
+            [sys.executable, os.path.join(TESTS_DIR, 'xfconf_service.py')],
+            env=env)
+        self.connection = self.connect()
+        self.assertTrue(wait_for(lambda: self.connection.call_sync(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus',
+            'org.freedesktop.DBus', 'NameHasOwner',
+            GLib.Variant('(s)', (self.xfsync.XFCONF_BUS_NAME,)), None,
+            Gio.DBusCallFlags.NONE, 1000, None).unpack()[0]),
+            "the xfconf service did not start")
+        self.xfsync.xfconf_set_connection(self.connection)
+
+    def tearDown(self):
+        self.xfsync.xfconf_set_connection(None)
+        self.service.terminate()
+        self.service.wait()
+        self.connection.close_sync(None)
+
+    def set_from_other_client(self, channel, prop, value):
+        """Write prop the way another xfconf client would."""
+        other = self.connect()
+        other.call_sync(
+            self.xfsync.XFCONF_BUS_NAME, self.xfsync.XFCONF_OBJECT_PATH,
+            self.xfsync.XFCONF_INTERFACE, 'SetProperty',
+            GLib.Variant('(ssv)', (channel, prop, value)), None,
+            Gio.DBusCallFlags.NONE, 1000, None)
+        other.close_sync(None)
+
+    def test_missing_channel_is_empty(self):
+        self.assertEqual(
+            self.xfsync.xfconf_list_properties('xfce4-power-manager'), {})
+        xfpm = self.xfsync.XfpmSync()
+        self.assertFalse(xfpm.get_lock())
+        self.assertFalse(self.xfsync.XfceSessionSync().get_lock())
+
+        # The missing properties are created with the first change.
+        xfpm.set_lock(True)
+        self.assertEqual(
+            self.xfsync.xfconf_get_property('xfce4-power-manager', LOCK),
+            True)
+
+    def test_property_changed_updates_cache(self):
+        self.set_from_other_client('xfce4-session', '/shutdown/LockScreen',
+                                   GLib.Variant('b', False))
+        self.assertEqual(self.xfsync.xfconf_get_channel('xfce4-session'),
+                         {'/shutdown/LockScreen': False})
+
+        self.set_from_other_client('xfce4-session', '/shutdown/LockScreen',
+                                   GLib.Variant('b', True))
+        self.assertTrue(wait_for(lambda: self.xfsync.xfconf_get_channel(
+            'xfce4-session') == {'/shutdown/LockScreen': True}))
+        self.assertTrue(self.xfsync.XfceSessionSync().get_lock())
+
+    def test_failed_xfconf_query_raises(self):
+        # Without xfconfd, writes fall back to an xfconf-query that fails.
+        self.service.terminate()
+        self.service.wait()
+        bin_dir = tempfile.mkdtemp(prefix='light-locker-settings-test-')
+        self.addCleanup(shutil.rmtree, bin_dir)
+        xfconf_query = os.path.join(bin_dir, 'xfconf-query')
+        with open(xfconf_query, 'w') as f:
+            f.write("#!/bin/sh\nexit 1\n")
+        os.chmod(xfconf_query, 0o755)
+        path = os.environ['PATH']
+        self.addCleanup(os.environ.__setitem__, 'PATH', path)
+        os.environ['PATH'] = bin_dir + os.pathsep + path
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.xfsync.xfconf_set_property('xfce4-session',
+                                            '/shutdown/LockScreen', True)
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.xfsync.xfconf_init_property('xfce4-session',
+                                             '/shutdown/LockScreen', bool,
+                                             True)
+
+
+if __name__ == "__main__":
+    unittest.main()
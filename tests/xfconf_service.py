@@ -0,0 +1,115 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+#   Light Locker Settings - simple configuration tool for light-locker
+#   Copyright © 2015 Antergos Developers <dev@antergos.com>
+#
+#   This program is free software: you can redistribute it and/or modify it
+#   under the terms of the GNU General Public License version 3, as published
+#   by the Free Software Foundation.
+#
+#   This program is distributed in the hope that it will be useful, but
+#   WITHOUT ANY WARRANTY; without even the implied warranties of
+#   MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+#   PURPOSE.  See the GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+''' Stand-in for xfconfd, run by test_xfsync.py on a private bus:
+
+    xfconf_service.py
+
+Channels are kept in memory and start out missing, as on a system where
+Xfce has never been configured. Only the methods and signals used by
+light_locker_xfsync.py are implemented. '''
+
+import sys
+
+from gi.repository import Gio, GLib
+
+XFCONF_BUS_NAME = 'org.xfce.Xfconf'
+XFCONF_OBJECT_PATH = '/org/xfce/Xfconf'
+XFCONF_INTERFACE = 'org.xfce.Xfconf'
+
+INTROSPECTION = '''
+<node>
+  <interface name="org.xfce.Xfconf">
+    <method name="SetProperty">
+      <arg direction="in" type="s" name="channel"/>
+      <arg direction="in" type="s" name="property"/>
+      <arg direction="in" type="v" name="value"/>
+    </method>
+    <method name="GetProperty">
+      <arg direction="in" type="s" name="channel"/>
+      <arg direction="in" type="s" name="property"/>
+      <arg direction="out" type="v" name="value"/>
+    </method>
+    <method name="GetAllProperties">
+      <arg direction="in" type="s" name="channel"/>
+      <arg direction="in" type="s" name="property_base"/>
+      <arg direction="out" type="a{sv}" name="properties"/>
+    </method>
+    <signal name="PropertyChanged">
+      <arg type="s" name="channel"/>
+      <arg type="s" name="property"/>
+      <arg type="v" name="value"/>
+    </signal>
+  </interface>
+</node>
+'''
+
+
+class Xfconf:
+    """The org.xfce.Xfconf object."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.channels = dict()
+
+    def method_call_cb(self, connection, sender, object_path, interface_name,
+                       method_name, parameters, invocation):
+        if method_name == 'SetProperty':
+            channel, prop = parameters.get_child_value(0).get_string(), \
+                parameters.get_child_value(1).get_string()
+            value = parameters.get_child_value(2).get_variant()
+            self.channels.setdefault(channel, dict())[prop] = value
+            invocation.return_value(None)
+            connection.emit_signal(
+                None, XFCONF_OBJECT_PATH, XFCONF_INTERFACE, 'PropertyChanged',
+                GLib.Variant('(ssv)', (channel, prop, value)))
+            return
+
+        channel = parameters.get_child_value(0).get_string()
+        prop = parameters.get_child_value(1).get_string()
+        if channel not in self.channels:
+            invocation.return_dbus_error(
+                XFCONF_INTERFACE + '.Error.ChannelNotFound',
+                "Channel \"%s\" does not exist" % channel)
+        elif method_name == 'GetAllProperties':
+            invocation.return_value(GLib.Variant(
+                '(a{sv})', (self.channels[channel],)))
+        elif prop in self.channels[channel]:
+            invocation.return_value(GLib.Variant(
+                '(v)', (self.channels[channel][prop],)))
+        else:
+            invocation.return_dbus_error(
+                XFCONF_INTERFACE + '.Error.PropertyNotFound',
+                "Property \"%s\" does not exist" % prop)
+
+
+def main():
+    loop = GLib.MainLoop()
+    connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    xfconf = Xfconf(connection)
+    node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+    connection.register_object(XFCONF_OBJECT_PATH, node.interfaces[0],
+                               xfconf.method_call_cb, None, None)
+    Gio.bus_own_name_on_connection(connection, XFCONF_BUS_NAME,
+                                   Gio.BusNameOwnerFlags.NONE, None,
+                                   lambda *args: loop.quit())
+    loop.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())